@@ -0,0 +1,63 @@
+"""
+Time every registered diff engine on a few document shapes. Run from a
+checkout:
+
+    PYTHONPATH=. python benchmarks/bench_diff.py [repeat]
+"""
+import random
+import sys
+import time
+
+from delta import Delta
+from delta.base import diff_engines
+
+
+def _paragraphs(rng, count):
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'elit', 'sed', 'do']
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(4, 16))) + '\n'
+            for _ in range(count)]
+
+
+def _cases(rng):
+    lines = _paragraphs(rng, 400)
+    base = ''.join(lines)
+
+    typed = list(lines)
+    typed[200] = typed[200][:10] + 'typing here ' + typed[200][10:]
+
+    moved = list(lines)
+    moved.insert(50, moved.pop(300))
+
+    rewritten = list(lines)
+    for i in rng.sample(range(len(lines)), 40):
+        rewritten[i] = _paragraphs(rng, 1)[0]
+
+    unrelated = ''.join(_paragraphs(rng, 400))
+
+    return [
+        ('small edit', base, ''.join(typed)),
+        ('line move', base, ''.join(moved)),
+        ('10% rewritten', base, ''.join(rewritten)),
+        ('unrelated', base, unrelated),
+    ]
+
+
+def main(repeat=5):
+    rng = random.Random(0)
+    for label, a, b in _cases(rng):
+        doc_a = Delta().insert(a)
+        doc_b = Delta().insert(b)
+        print(f'{label} ({len(a)} -> {len(b)} chars)')
+        for name in sorted(diff_engines):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                change = doc_a.diff(doc_b, engine=name)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            assert doc_a.compose(change) == doc_b
+            print(f'  {name:<8} {best * 1000:9.2f} ms  {len(change.ops):5d} ops')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
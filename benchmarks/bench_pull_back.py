@@ -0,0 +1,75 @@
+"""
+Count how restored block boundaries are pulled back through prior moves.
+
+Transforms multi-move changes against deletions that remove a newline at a
+move boundary, and reports how many restorations the neighbour candidates
+resolve, how many fall back to a plain delta, and the time spent.
+Run from a checkout:
+
+    PYTHONPATH=. python benchmarks/bench_pull_back.py [trials] [lines]
+"""
+import random
+import sys
+import time
+
+from delta import BlockDelta, Delta
+from delta import change
+
+
+def _case(rng, lines):
+    texts = [f'line {i} ' * rng.randint(0, 2) + '\n' for i in range(lines)]
+    document = Delta().insert(''.join(texts))
+    joined = rng.randrange(lines - 1)
+    start = sum(len(t) for t in texts[:joined + 1]) - 1 - rng.randint(0, 1)
+    deleted = {'delta': Delta().retain(max(start, 0)).delete(rng.randint(1, 3)), 'blockDelta': BlockDelta()}
+    moves = BlockDelta()
+    cursor = 0
+    for _ in range(rng.randint(2, 4)):
+        skip = rng.randint(0, 3)
+        if cursor + skip + 1 >= lines:
+            break
+        moves = moves.retain(skip).move(1, rng.randrange(lines + 1))
+        cursor += skip + 1
+    insert = rng.choice(['z', 'z\n', '\nz'])
+    moved = {'delta': Delta().retain(rng.randrange(document.length())).insert(insert), 'blockDelta': moves}
+    return document, deleted, moved
+
+
+def main(trials=300, lines=40):
+    counts = {'restorations': 0, 'resolved': 0, 'not found': 0}
+    spent = [0.0]
+    pull_back = change._pull_back_required_boundary
+
+    def counted(pre_move_state, required, prior_steps, current_step_state, target_state, newline='\n'):
+        start = time.perf_counter()
+        result = pull_back(pre_move_state, required, prior_steps, current_step_state, target_state, newline)
+        spent[0] += time.perf_counter() - start
+        if not required['restored'] or required['boundary']['newlineUnit'] is None:
+            return result
+        counts['restorations'] += 1
+        counts['resolved' if result['found'] else 'not found'] += 1
+        return result
+
+    change._pull_back_required_boundary = counted
+    rng = random.Random(0)
+    start = time.perf_counter()
+    try:
+        for _ in range(trials):
+            document, deleted, moved = _case(rng, lines)
+            for priority in (True, False):
+                try:
+                    change.transform_change(deleted, moved, document, priority)
+                except ValueError:
+                    pass
+    finally:
+        change._pull_back_required_boundary = pull_back
+    total = time.perf_counter() - start
+
+    print(f'{trials} trials, {lines} lines')
+    for label, count in counts.items():
+        print(f'  {label:<12} {count:6d}')
+    print(f'  pull-back    {spent[0] * 1000:9.2f} ms of {total * 1000:9.2f} ms')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
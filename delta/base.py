@@ -1,9 +1,9 @@
-import copy
-from functools import reduce
+from bisect import bisect_left
 
 import diff_match_patch
 
-from . import op
+from . import op, text_diff
+from .block_index import BlockIndex
 
 
 NULL_CHARACTER = chr(0)
@@ -33,10 +33,90 @@ def get_embed_type_and_data(a, b):
     return [embed_type, a[embed_type], b[embed_type]]
 
 
+def _is_document_op(o):
+    insert = o.get('insert')
+    return bool(insert) or insert == ''
+
+
+def _diff_into(delta, a, b, engine=differ):
+    """Push the diff of documents ``a`` and ``b`` onto ``delta``."""
+    a_it = a.iterator()
+    b_it = b.iterator()
+    for code, text in engine(a.document(), b.document()):
+        length = op.utf16_len(text)
+        while length > 0:
+            op_length = 0
+            if code == DIFF_INSERT:
+                op_length = min(b_it.peek_length(), length)
+                delta.push(b_it.next(op_length))
+            elif code == DIFF_DELETE:
+                op_length = min(length, a_it.peek_length())
+                a_it.next(op_length)
+                delta.delete(op_length)
+            elif code == DIFF_EQUAL:
+                op_length = min(
+                    a_it.peek_length(),
+                    b_it.peek_length(),
+                    length)
+                a_op = a_it.next(op_length)
+                b_op = b_it.next(op_length)
+                if a_op.get('insert') == b_op.get('insert'):
+                    attributes = op.diff(
+                        a_op.get('attributes'),
+                        b_op.get('attributes'))
+                    delta.retain(op_length, **(attributes or {}))
+                else:
+                    delta.push(b_op).delete(op_length)
+            else:
+                raise RuntimeError(
+                    f'Diff library returned unknown op code: {code!r}')
+            if op_length == 0:
+                return None
+            length -= op_length
+    return delta
+
+
 handlers = {}
+diff_engines = {
+    'dmp': differ,
+    'myers': text_diff.myers,
+    'lines': text_diff.line_mode,
+}
+
+
+def _is_compact(delta):
+    return bool(delta.ops) and delta.ops[0].__class__ is op.Op
+
+
+def _compact_op(o):
+    return o if o.__class__ is op.Op else op.Op.from_dict(o)
+
+
+def _new_op(kind, payload, attributes, compact):
+    """Build an op in the compact or the dict form."""
+    if compact:
+        return op.Op(kind, payload, attributes or None)
+    new_op = {kind: payload}
+    if attributes:
+        new_op['attributes'] = attributes
+    return new_op
+
+
+def _expanded(o):
+    o = dict(o)
+    if 'attributes' in o:
+        o['attributes'] = dict(o['attributes'])
+    return o
+
+
+def _same_stamp(cached, current):
+    return cached[0] is current[0] and cached[1:] == current[1:]
 
 
 class Delta:
+    _offsets = None
+    _block_index = None
+    _cache_token = None
 
     @staticmethod
     def register_embed(embed_type, handler):
@@ -53,6 +133,23 @@ class Delta:
             raise ValueError(f'no handlers for embed type "{embed_type}"')
         return handler
 
+    @staticmethod
+    def register_diff_engine(name, engine):
+        diff_engines[name] = engine
+
+    @staticmethod
+    def unregister_diff_engine(name):
+        diff_engines.pop(name, None)
+
+    @staticmethod
+    def get_diff_engine(engine):
+        if callable(engine):
+            return engine
+        found = diff_engines.get(engine)
+        if found is None:
+            raise ValueError(f'no diff engine named "{engine}"')
+        return found
+
     def __init__(self, ops=None, **attrs):
         if hasattr(ops, 'ops'):
             ops = ops.ops
@@ -70,25 +167,34 @@ class Delta:
             return self
         new_op = {'insert': text}
         if attrs:
-            new_op['attributes'] = attrs
+            new_op['attributes'] = op.intern_attributes(attrs)
         return self.push(new_op)
 
     def delete(self, length):
         if length <= 0:
             return self
-        return self.push({'delete': length})
+        return self._push_owned({'delete': length})
 
     def retain(self, length, **attrs):
         if isinstance(length, (int, float)) and length <= 0:
             return self
         new_op = {'retain': length}
         if attrs:
-            new_op['attributes'] = attrs
+            new_op['attributes'] = op.intern_attributes(attrs)
         return self.push(new_op)
 
     def push(self, operation):
+        return self._push_owned(op.clone(operation))
+
+    def _push_owned(self, new_op):
+        """
+        Push an op without the defensive copy made by ``push``.
+
+        Only for ops built by the caller that nothing else references: the op
+        may be stored as-is or merged into in place.
+        """
+        self._offsets = self._block_index = self._cache_token = None
         index = len(self.ops)
-        new_op = copy.deepcopy(operation)
         if index == 0:
             self.ops.append(new_op)
             return self
@@ -106,7 +212,9 @@ class Delta:
                 return self
             last_op = self.ops[index - 1]
 
-        if new_op.get('attributes') == last_op.get('attributes'):
+        new_attributes = new_op.get('attributes')
+        last_attributes = last_op.get('attributes')
+        if new_attributes is last_attributes or new_attributes == last_attributes:
             if isinstance(new_op.get('insert'), str) and isinstance(last_op.get('insert'), str):
                 last_op['insert'] += new_op['insert']
                 return self
@@ -127,14 +235,16 @@ class Delta:
             return self
         self.push(ops[0])
         self.ops.extend(ops[1:])
+        self._offsets = self._block_index = self._cache_token = None
         return self
 
     def concat(self, other):
-        delta = self.__class__(copy.deepcopy(self.ops))
+        delta = self.__class__(op.clone(self.ops))
         delta.extend(other)
         return delta
 
     def chop(self):
+        self._offsets = self._block_index = self._cache_token = None
         if self.ops:
             last_op = self.ops[-1]
             if isinstance(last_op.get('retain'), (int, float)) and not last_op.get('attributes'):
@@ -155,6 +265,14 @@ class Delta:
                     'document() can only be called on Deltas that have only insert ops')
         return ''.join(parts)
 
+    def compact(self):
+        """Return a copy of this Delta whose ops are compact ``op.Op`` objects."""
+        return self.__class__([op.Op.from_dict(o) for o in self.ops])
+
+    def expand(self):
+        """Return a copy of this Delta with plain JSON dict ops."""
+        return self.__class__([o.to_dict() if isinstance(o, op.Op) else _expanded(o) for o in self.ops])
+
     def __iter__(self):
         return iter(self.ops)
 
@@ -173,9 +291,17 @@ class Delta:
         if (start is not None and start < 0) or (stop is not None and stop < 0):
             raise ValueError('no support for negative indexing.')
 
+        ends = self._op_offsets()[0]
+        first = bisect_left(ends, start)
+        if first < len(ends) and ends[first] == start and start > (ends[first - 1] if first else 0):
+            first += 1
         ops = []
         it = self.iterator()
-        pos = 0
+        it.index = first
+        pos = ends[first - 1] if first else 0
+        if first < len(ends) and pos < start:
+            it.offset = start - pos
+            pos = start
         while it.has_next():
             if stop is not None and pos >= stop:
                 break
@@ -191,6 +317,46 @@ class Delta:
     def __len__(self):
         return sum(op.length(o) for o in self.ops)
 
+    def _ops_stamp(self):
+        """
+        What the lazily built indexes below are checked against. Deltas can
+        share one ops list (``Delta(other)``), so a push through another
+        delta can merge into it without this one noticing: besides the list
+        and its length, the stamp records the payloads of the last two ops,
+        the only ones a push merges into. Editing an op dict elsewhere in the
+        list is not detected; reassign ``ops`` after doing so.
+        """
+        ops = self.ops
+        tail = tuple((o.get('insert'), o.get('retain'), o.get('delete')) for o in ops[-2:])
+        return ops, len(ops), tail
+
+    def _op_offsets(self):
+        """
+        Cumulative op end offsets, built on first use.
+
+        Returns ``(ends, base_ends, out_ends)``: where each op ends in this
+        delta, in the document it applies to (retains and deletes) and in the
+        document it produces (inserts and retains). ``push``, ``extend`` and
+        ``chop`` drop the index.
+        """
+        offsets = self._offsets
+        stamp = self._ops_stamp()
+        if offsets is None or not _same_stamp(offsets[0], stamp):
+            ends, base_ends, out_ends = [], [], []
+            end = base_end = out_end = 0
+            for o in self.ops:
+                length = op.length(o)
+                end += length
+                if op.type(o) != 'insert':
+                    base_end += length
+                if op.type(o) != 'delete':
+                    out_end += length
+                ends.append(end)
+                base_ends.append(base_end)
+                out_ends.append(out_end)
+            offsets = self._offsets = (stamp, ends, base_ends, out_ends)
+        return offsets[1:]
+
     def iterator(self):
         return op.iterator(self.ops)
 
@@ -206,9 +372,43 @@ class Delta:
     def length(self):
         return sum(op.length(o) for o in self)
 
+    def block_index(self, newline='\n'):
+        """
+        The ``BlockIndex`` of this document, built on first use.
+
+        Composing a document that has an index derives the result's index
+        from the change instead of rescanning it.
+        """
+        cached = self._block_index
+        stamp = self._ops_stamp()
+        if cached is None or not _same_stamp(cached[0], stamp) or cached[1].newline != newline:
+            cached = self._block_index = (stamp, BlockIndex.from_document(self, newline))
+        return cached[1]
+
+    def cache_token(self):
+        """
+        An opaque token for the current contents of this delta, for keying
+        caches such as ``delta.change.resolution_cache``. Building onto the
+        delta yields a new token; after editing ``ops`` in place, invalidate
+        dependent caches explicitly.
+        """
+        cached = self._cache_token
+        stamp = self._ops_stamp()
+        if cached is None or not _same_stamp(cached[0], stamp):
+            cached = self._cache_token = (stamp, object())
+        return cached[1]
+
     def compose(self, other):
+        composed = self._compose(other)
+        cached = self._block_index
+        if cached is not None and _same_stamp(cached[0], self._ops_stamp()):
+            composed._block_index = (composed._ops_stamp(), cached[1].compose(other))
+        return composed
+
+    def _compose(self, other):
         self_it = self.iterator()
         other_it = other.iterator()
+        compact = _is_compact(self) or _is_compact(other)
         ops = []
         first_other = other_it.peek()
 
@@ -218,103 +418,145 @@ class Delta:
             first_left = first_other['retain']
             while self_it.peek_type() == 'insert' and self_it.peek_length() <= first_left:
                 first_left -= self_it.peek_length()
-                ops.append(self_it.next())
+                ops.append(_compact_op(self_it.next()) if compact else self_it.next())
             if first_other['retain'] - first_left > 0:
                 other_it.next(first_other['retain'] - first_left)
 
         delta = self.__class__(ops)
         while self_it.has_next() or other_it.has_next():
             if other_it.peek_type() == 'insert':
-                delta.push(other_it.next())
+                other_op = other_it.next()
+                delta.push(_compact_op(other_op) if compact else other_op)
             elif self_it.peek_type() == 'delete':
-                delta.push(self_it.next())
+                self_op = self_it.next()
+                delta._push_owned(_compact_op(self_op) if compact else self_op)
             else:
                 length = min(self_it.peek_length(), other_it.peek_length())
                 self_op = self_it.next(length)
                 other_op = other_it.next(length)
                 if other_op.get('retain'):
-                    new_op = {}
                     if isinstance(self_op.get('retain'), (int, float)):
-                        new_op['retain'] = (
+                        kind = 'retain'
+                        payload = (
                             length if isinstance(other_op.get('retain'), (int, float))
-                            else other_op['retain']
+                            else op.clone(other_op['retain'])
                         )
                     elif isinstance(other_op.get('retain'), (int, float)):
                         if self_op.get('retain') is None:
-                            new_op['insert'] = self_op.get('insert')
+                            kind, payload = 'insert', op.clone(self_op.get('insert'))
                         else:
-                            new_op['retain'] = self_op.get('retain')
+                            kind, payload = 'retain', op.clone(self_op.get('retain'))
                     else:
-                        action = 'insert' if self_op.get('retain') is None else 'retain'
+                        kind = 'insert' if self_op.get('retain') is None else 'retain'
                         embed_type, self_data, other_data = get_embed_type_and_data(
-                            self_op.get(action), other_op.get('retain'))
+                            self_op.get(kind), other_op.get('retain'))
                         handler = Delta.get_handler(embed_type)
-                        new_op[action] = {
-                            embed_type: handler.compose(
-                                self_data, other_data, action == 'retain')
+                        payload = {
+                            embed_type: op.clone(handler.compose(
+                                self_data, other_data, kind == 'retain'))
                         }
 
                     attributes = op.compose(
                         self_op.get('attributes'),
                         other_op.get('attributes'),
                         isinstance(self_op.get('retain'), (int, float)))
-                    if attributes:
-                        new_op['attributes'] = attributes
-                    delta.push(new_op)
+                    new_op = _new_op(kind, payload, attributes, compact)
+                    delta._push_owned(new_op)
 
                     if not other_it.has_next() and delta.ops[-1] == new_op:
-                        rest = Delta(self_it.rest())
-                        return delta.concat(rest).chop()
+                        rest = self_it.rest()
+                        return delta.extend([_compact_op(o) for o in rest] if compact else rest).chop()
                 elif (op.type(other_op) == 'delete'
                       and isinstance(self_op.get('retain'), (int, float, dict))):
-                    delta.push(other_op)
+                    delta._push_owned(_compact_op(other_op) if compact else other_op)
         return delta.chop()
 
-    def diff(self, other):
+    @classmethod
+    def compose_many(cls, deltas):
+        """
+        Compose a sequence of deltas left to right in one call.
+
+        Equivalent to ``reduce(Delta.compose, deltas)``. The changes after the
+        first are folded pairwise in a balanced tree, so intermediate results
+        grow with the changes they cover rather than with the document, and
+        the first delta is composed only once, with the combined change.
+        """
+        deltas = [d if hasattr(d, 'ops') else cls(d) for d in deltas]
+        if not deltas:
+            return cls()
+        if len(deltas) == 1:
+            return cls(op.clone(deltas[0].ops))
+        level = deltas[1:]
+        while len(level) > 1:
+            paired = [level[i].compose(level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                paired.append(level[-1])
+            level = paired
+        return deltas[0].compose(level[0])
+
+    def diff(self, other, hint=None, engine='dmp'):
         """
         Returns a diff of two *documents* (Deltas with only insert ops).
+
+        ``engine`` names a registered text diff engine (``'dmp'``, ``'myers'``
+        or ``'lines'``) or is a callable taking two strings and returning
+        diff_match_patch style ``(code, text)`` tuples.
+
+        Whole ops shared at the start and end of both documents are retained
+        without running the text diff over them. ``hint`` is an optional
+        ``(index, length)`` range of this document that is known to contain
+        every change; when the text around it matches, only that range is
+        diffed. A hint that does not hold is ignored.
         """
         if self.ops == other.ops:
             return self.__class__()
 
-        self_doc = self.document()
-        other_doc = other.document()
-        self_it = self.iterator()
-        other_it = other.iterator()
-
-        delta = self.__class__()
-        for code, text in differ(self_doc, other_doc):
-            length = op.utf16_len(text)
-            while length > 0:
-                op_length = 0
-                if code == DIFF_INSERT:
-                    op_length = min(other_it.peek_length(), length)
-                    delta.push(other_it.next(op_length))
-                elif code == DIFF_DELETE:
-                    op_length = min(length, self_it.peek_length())
-                    self_it.next(op_length)
-                    delta.delete(op_length)
-                elif code == DIFF_EQUAL:
-                    op_length = min(
-                        self_it.peek_length(),
-                        other_it.peek_length(),
-                        length)
-                    self_op = self_it.next(op_length)
-                    other_op = other_it.next(op_length)
-                    if self_op.get('insert') == other_op.get('insert'):
-                        attributes = op.diff(
-                            self_op.get('attributes'),
-                            other_op.get('attributes'))
-                        delta.retain(op_length, **(attributes or {}))
-                    else:
-                        delta.push(other_op).delete(op_length)
-                else:
-                    raise RuntimeError(
-                        f'Diff library returned unknown op code: {code!r}')
-                if op_length == 0:
-                    return
-                length -= op_length
-        return delta.chop()
+        engine = self.get_diff_engine(engine)
+        if hint is not None:
+            narrowed = self._diff_hinted(other, hint, engine)
+            if narrowed is not None:
+                return narrowed
+
+        self_ops = self.ops
+        other_ops = other.ops
+        limit = min(len(self_ops), len(other_ops))
+        prefix = 0
+        while prefix < limit and self_ops[prefix] == other_ops[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and self_ops[-1 - suffix] == other_ops[-1 - suffix]:
+            suffix += 1
+
+        shared = self_ops[:prefix] + self_ops[len(self_ops) - suffix:]
+        if not all(_is_document_op(o) for o in shared):
+            raise ValueError(
+                'document() can only be called on Deltas that have only insert ops')
+
+        delta = self.__class__().retain(sum(op.length(o) for o in self_ops[:prefix]))
+        delta = _diff_into(
+            delta,
+            self.__class__(self_ops[prefix:len(self_ops) - suffix]),
+            self.__class__(other_ops[prefix:len(other_ops) - suffix]),
+            engine)
+        return delta.chop() if delta is not None else None
+
+    def _diff_hinted(self, other, hint, engine):
+        index, length = hint
+        other_length = length + len(other) - len(self)
+        if index < 0 or length < 0 or other_length < 0:
+            return None
+        head = self[:index]
+        if len(head) != index or head != other[:index]:
+            return None
+        if self[index + length:] != other[index + other_length:]:
+            return None
+        self_middle = self[index:index + length]
+        other_middle = other[index:index + other_length]
+        # Offsets inside a surrogate pair slice unevenly; fall back to a full diff.
+        if len(self_middle) != length or len(other_middle) != other_length:
+            return None
+        delta = _diff_into(self.__class__().retain(index), self_middle, other_middle, engine)
+        return delta.chop() if delta is not None else None
 
     def each_line(self, fn, newline='\n'):
         for line, attributes, index in self.iter_lines(newline):
@@ -322,68 +564,112 @@ class Delta:
                 break
 
     def iter_lines(self, newline='\n'):
-        it = self.iterator()
-        line = self.__class__()
-        i = 0
-        while it.has_next():
-            if it.peek_type() != 'insert':
-                return
-            current_op = it.peek()
-            start = op.length(current_op) - it.peek_length()
-            if isinstance(current_op.get('insert'), str):
-                nl_index = current_op['insert'][start:].find(newline)
-            else:
-                nl_index = -1
+        for span in self.iter_line_spans(newline):
+            yield self.line_delta(span), span['attributes'], span['index']
 
-            if nl_index < 0:
-                line.push(it.next())
-            elif nl_index > 0:
-                line.push(it.next(nl_index))
+    def iter_line_spans(self, newline='\n'):
+        """
+        Yield one record per line without copying any text.
+
+        Each record is a dict with ``start`` and ``end`` positions, given as
+        ``(op index, string offset)`` pairs, that bound the line's content
+        (``end`` is where the newline sits). It also holds the newline's
+        ``attributes`` (not copied) and the line ``index``. ``line_delta``
+        materializes a record as a Delta.
+        """
+        ops = self.ops
+        start = (0, 0)
+        index = 0
+        pending = False
+        for op_index, o in enumerate(ops):
+            if op.type(o) != 'insert':
+                return
+            insert = o['insert']
+            if not isinstance(insert, str):
+                pending = True
+                continue
+            found = insert.find(newline)
+            if found < 0:
+                pending = pending or bool(insert)
+                continue
+            while found >= 0:
+                yield {
+                    'start': start,
+                    'end': (op_index, found),
+                    'attributes': o.get('attributes') or {},
+                    'index': index,
+                }
+                index += 1
+                start = (op_index, found + len(newline))
+                found = insert.find(newline, start[1])
+            pending = start[1] < len(insert)
+        if pending:
+            yield {'start': start, 'end': (len(ops), 0), 'attributes': {}, 'index': index}
+
+    def line_delta(self, span):
+        """Build the Delta for a record from ``iter_line_spans``."""
+        (first, offset), (last, end) = span['start'], span['end']
+        line = self.__class__()
+        for op_index in range(first, min(last + 1, len(self.ops))):
+            o = self.ops[op_index]
+            lo = offset if op_index == first else 0
+            hi = end if op_index == last else None
+            if lo == 0 and hi is None:
+                line.push(o)
+                continue
+            text = o['insert'][lo:hi]
+            if not text:
+                continue
+            if isinstance(o, op.Op):
+                line._push_owned(op.Op('insert', text, o.attributes))
+            elif o.get('attributes'):
+                line._push_owned({'insert': text, 'attributes': op.clone(o['attributes'])})
             else:
-                attributes = it.next(1).get('attributes', {})
-                yield line, attributes, i
-                i += 1
-                line = Delta()
-        if len(line) > 0:
-            yield line, {}, i
+                line._push_owned({'insert': text})
+        return line
 
     def invert(self, base):
+        """
+        Returns the change that undoes this one when applied after it.
+
+        ``base`` is the document this change applies to. It is read with a
+        single cursor that moves forward alongside the change, so inverting
+        costs O(change + base) however many regions the change touches.
+        """
         inverted = Delta()
+        base_it = base.iterator()
+        compact = _is_compact(self) or _is_compact(base)
 
-        def fn(base_index, operator):
-            if op.type(operator) == 'insert':
-                inverted.delete(op.length(operator))
+        for operator in self.ops:
+            op_type = op.type(operator)
+            if op_type == 'insert':
+                inverted._push_owned(_new_op('delete', op.length(operator), None, compact))
             elif isinstance(operator.get('retain'), (int, float)) and operator.get('attributes') is None:
-                inverted.retain(operator['retain'])
-                return base_index + operator['retain']
-            elif op.type(operator) == 'delete' or isinstance(operator.get('retain'), (int, float)):
+                inverted._push_owned(_new_op('retain', operator['retain'], None, compact))
+                length = operator['retain']
+                while length > 0 and base_it.has_next():
+                    length -= op.length(base_it.next(length))
+            elif op_type == 'delete' or isinstance(operator.get('retain'), (int, float)):
                 length = int(operator.get('delete') or operator.get('retain'))
-                for base_op in base[base_index:base_index + length]:
-                    if op.type(operator) == 'delete':
-                        inverted.push(base_op)
+                while length > 0 and base_it.has_next():
+                    base_op = base_it.next(length)
+                    length -= op.length(base_op)
+                    if op_type == 'delete':
+                        inverted.push(_compact_op(base_op) if compact else base_op)
                     elif operator.get('retain') and operator.get('attributes'):
-                        inverted.retain(
-                            op.length(base_op),
-                            **(op.invert(
-                                operator.get('attributes'),
-                                base_op.get('attributes')) or {}))
-                return base_index + length
+                        inverted.push(_new_op(
+                            'retain', op.length(base_op),
+                            op.invert(operator.get('attributes'), base_op.get('attributes')), compact))
             elif isinstance(operator.get('retain'), dict):
-                base_op = op.iterator(base[base_index].ops).next()
+                base_op = base_it.next(1)
                 embed_type, op_data, base_op_data = get_embed_type_and_data(
                     operator['retain'], base_op.get('insert'))
                 handler = Delta.get_handler(embed_type)
                 new_embed = {embed_type: handler.invert(op_data, base_op_data)}
-                inverted.retain(
-                    new_embed,
-                    **(op.invert(
-                        operator.get('attributes'),
-                        base_op.get('attributes')) or {}))
-                return base_index + 1
-
-            return base_index
+                inverted.push(_new_op(
+                    'retain', new_embed,
+                    op.invert(operator.get('attributes'), base_op.get('attributes')), compact))
 
-        reduce(fn, self.ops, 0)
         return inverted.chop()
 
     def transform(self, other, priority=False):
@@ -392,13 +678,15 @@ class Delta:
 
         self_it = self.iterator()
         other_it = other.iterator()
+        compact = _is_compact(self) or _is_compact(other)
         delta = Delta()
 
         while self_it.has_next() or other_it.has_next():
             if self_it.peek_type() == 'insert' and (priority or other_it.peek_type() != 'insert'):
-                delta.retain(op.length(self_it.next()))
+                delta._push_owned(_new_op('retain', op.length(self_it.next()), None, compact))
             elif other_it.peek_type() == 'insert':
-                delta.push(other_it.next())
+                other_op = other_it.next()
+                delta.push(_compact_op(other_op) if compact else other_op)
             else:
                 length = min(self_it.peek_length(), other_it.peek_length())
                 self_op = self_it.next(length)
@@ -406,7 +694,7 @@ class Delta:
                 if self_op.get('delete'):
                     continue
                 elif other_op.get('delete'):
-                    delta.push(other_op)
+                    delta._push_owned(_compact_op(other_op) if compact else other_op)
                 else:
                     self_data = self_op.get('retain')
                     other_data = other_op.get('retain')
@@ -423,18 +711,112 @@ class Delta:
                                         other_data[embed_type],
                                         priority)
                                 }
-                    delta.retain(
-                        transformed_data,
-                        **(op.transform(
-                            self_op.get('attributes'),
-                            other_op.get('attributes'),
-                            priority) or {}))
+                    delta.push(_new_op(
+                        'retain', transformed_data,
+                        op.transform(self_op.get('attributes'), other_op.get('attributes'), priority), compact))
 
         return delta.chop()
 
+    def transform_pair(self, other, priority=False):
+        """
+        Transform two concurrent deltas against each other in one pass.
+
+        Returns ``(self.transform(other, priority), other.transform(self,
+        not priority))``: ``other`` rebased onto this delta and this delta
+        rebased onto ``other``, which bring both sides to the same document.
+        """
+        self_it = self.iterator()
+        other_it = other.iterator()
+        compact = _is_compact(self) or _is_compact(other)
+        other_prime = Delta()
+        self_prime = Delta()
+
+        while self_it.has_next() or other_it.has_next():
+            if self_it.peek_type() == 'insert' and (priority or other_it.peek_type() != 'insert'):
+                self_op = self_it.next()
+                other_prime._push_owned(_new_op('retain', op.length(self_op), None, compact))
+                self_prime.push(_compact_op(self_op) if compact else self_op)
+            elif other_it.peek_type() == 'insert':
+                other_op = other_it.next()
+                other_prime.push(_compact_op(other_op) if compact else other_op)
+                self_prime._push_owned(_new_op('retain', op.length(other_op), None, compact))
+            else:
+                length = min(self_it.peek_length(), other_it.peek_length())
+                self_op = self_it.next(length)
+                other_op = other_it.next(length)
+                if self_op.get('delete'):
+                    if not other_op.get('delete'):
+                        self_prime._push_owned(_compact_op(self_op) if compact else self_op)
+                    continue
+                elif other_op.get('delete'):
+                    other_prime._push_owned(_compact_op(other_op) if compact else other_op)
+                    continue
+                self_data = self_op.get('retain')
+                other_data = other_op.get('retain')
+                other_transformed = other_data if isinstance(other_data, dict) else length
+                self_transformed = self_data if isinstance(self_data, dict) else length
+
+                if isinstance(self_data, dict) and isinstance(other_data, dict):
+                    embed_type = next(iter(self_data))
+                    if embed_type == next(iter(other_data)):
+                        handler = Delta.get_handler(embed_type)
+                        if handler:
+                            other_transformed = {
+                                embed_type: handler.transform(
+                                    self_data[embed_type], other_data[embed_type], priority)
+                            }
+                            self_transformed = {
+                                embed_type: handler.transform(
+                                    other_data[embed_type], self_data[embed_type], not priority)
+                            }
+                self_attributes = self_op.get('attributes')
+                other_attributes = other_op.get('attributes')
+                other_prime.push(_new_op(
+                    'retain', other_transformed,
+                    op.transform(self_attributes, other_attributes, priority), compact))
+                self_prime.push(_new_op(
+                    'retain', self_transformed,
+                    op.transform(other_attributes, self_attributes, not priority), compact))
+
+        return other_prime.chop(), self_prime.chop()
+
+    @classmethod
+    def transform_many(cls, history, other, priority=False):
+        """
+        Transform ``other`` against a sequence of deltas applied before it.
+
+        Equivalent to folding ``history[i].transform(other, priority)`` left
+        to right; ``other`` may be a delta or a position. Transforming against
+        ``compose_many(history)`` instead is not equivalent: a composed delta
+        puts its inserts before the text it deletes, so inserts tied at the
+        same position can land on the other side. The fold is kept, skipping
+        empty deltas and stopping once ``other`` is empty, so this is a
+        convenience that costs one ``transform`` per delta, like a loop.
+        """
+        is_delta = not isinstance(other, (int, float))
+        if is_delta:
+            other = cls(op.clone(other.ops if hasattr(other, 'ops') else other))
+        for delta in history:
+            if not hasattr(delta, 'ops'):
+                delta = cls(delta)
+            if is_delta and not other.ops:
+                break
+            if delta.ops:
+                other = delta.transform(other, priority)
+            elif is_delta:
+                other.chop()
+        return other
+
     def transform_position(self, index, priority=False):
+        # Ops that end strictly before ``index`` shift it by their net length.
+        _, base_ends, out_ends = self._op_offsets()
+        skip = bisect_left(base_ends, index)
         it = self.iterator()
         offset = 0
+        if skip:
+            it.index = skip
+            offset = out_ends[skip - 1]
+            index += out_ends[skip - 1] - base_ends[skip - 1]
         while it.has_next() and offset <= index:
             length = it.peek_length()
             next_type = it.peek_type()
@@ -446,3 +828,86 @@ class Delta:
                 index += length
             offset += length
         return index
+
+    def transform_positions(self, indices, priority=False):
+        """
+        Transform many positions against this delta in one sweep.
+
+        ``indices`` is a sequence (or NumPy array) of positions, or of
+        ``(anchor, head)`` selection pairs, which come back as tuples.
+        ``priority`` is a single flag or one flag per entry. Results are
+        returned as a list in input order and match calling
+        ``transform_position`` on each position.
+        """
+        if hasattr(indices, 'tolist'):
+            indices = indices.tolist()
+        if hasattr(priority, 'tolist'):
+            priority = priority.tolist()
+        if isinstance(priority, (list, tuple)):
+            priorities = priority
+            if len(priorities) != len(indices):
+                raise ValueError('priority must be a flag or have one flag per index')
+        else:
+            priorities = [priority] * len(indices)
+
+        positions = []
+        flags = []
+        for entry, flag in zip(indices, priorities):
+            if isinstance(entry, (tuple, list)):
+                positions.extend(entry)
+                flags.extend([flag] * len(entry))
+            else:
+                positions.append(entry)
+                flags.append(flag)
+        results = [0] * len(positions)
+        order = sorted(range(len(positions)), key=positions.__getitem__)
+
+        # Cursors at the current base position, waiting on the next op.
+        at_base = []
+        next_cursor = 0
+        base = 0
+        offset = 0
+        for operator in self.ops:
+            length = op.length(operator)
+            op_type = op.type(operator)
+            end = base + length if op_type == 'delete' else base
+            while next_cursor < len(order) and positions[order[next_cursor]] <= end:
+                at_base.append(order[next_cursor])
+                next_cursor += 1
+            if op_type == 'insert':
+                waiting = []
+                for cursor in at_base:
+                    if flags[cursor]:
+                        results[cursor] = offset
+                    else:
+                        waiting.append(cursor)
+                at_base = waiting
+                offset += length
+            elif op_type == 'retain':
+                if length > 0:
+                    for cursor in at_base:
+                        results[cursor] = offset
+                    at_base = []
+                while next_cursor < len(order) and positions[order[next_cursor]] < base + length:
+                    cursor = order[next_cursor]
+                    results[cursor] = offset + positions[cursor] - base
+                    next_cursor += 1
+                base += length
+                offset += length
+            else:
+                base += length
+        for cursor in at_base:
+            results[cursor] = offset
+        for cursor in order[next_cursor:]:
+            results[cursor] = offset + positions[cursor] - base
+
+        transformed = []
+        position = 0
+        for entry in indices:
+            if isinstance(entry, (tuple, list)):
+                transformed.append(tuple(results[position:position + len(entry)]))
+                position += len(entry)
+            else:
+                transformed.append(results[position])
+                position += 1
+        return transformed
@@ -175,12 +175,12 @@ def transform_move(a, b, priority, block_count):
 
 def project_blocks(document, newline='\n'):
     """Project a document Delta into a list of {delta, attributes} blocks."""
-    from .base import Delta
+    from .op import clone
     blocks = []
-    for line, attributes, _index in document.iter_lines(newline):
+    for span in document.iter_line_spans(newline):
         blocks.append({
-            'delta': Delta(copy.deepcopy(line.ops)),
-            'attributes': copy.deepcopy(attributes or {}),
+            'delta': document.line_delta(span),
+            'attributes': clone(span['attributes']),
         })
     return blocks
 
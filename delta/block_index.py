@@ -0,0 +1,141 @@
+"""
+Newline index over a document Delta.
+
+A ``BlockIndex`` keeps the sorted UTF-16 offsets of every newline in a
+document, so block spans, boundaries and offset lookups cost O(log n) instead
+of a scan over the document. ``compose`` derives the index of a composed
+document from the change alone, shifting offsets after each edit point.
+Indexes are immutable.
+
+Like the labeled state, the index describes the canonical form of a document:
+one that does not end with a newline is treated as if one were appended.
+"""
+from bisect import bisect_left, bisect_right
+
+from . import op
+
+
+def _newline_offsets(text, newline):
+    """UTF-16 offsets of ``newline`` in ``text``."""
+    offsets = []
+    found = text.find(newline)
+    if op.is_bmp(text):
+        while found >= 0:
+            offsets.append(found)
+            found = text.find(newline, found + 1)
+        return offsets
+    previous = units = 0
+    while found >= 0:
+        units += op.utf16_len(text[previous:found])
+        offsets.append(units)
+        previous = found
+        found = text.find(newline, found + 1)
+    return offsets
+
+
+class BlockIndex:
+
+    def __init__(self, newlines, length, newline='\n'):
+        self.newlines = newlines
+        self.length = length
+        self.newline = newline
+
+    @classmethod
+    def from_document(cls, document, newline='\n'):
+        """Index a document Delta (insert ops only)."""
+        ops = document.ops if hasattr(document, 'ops') else document
+        newlines = []
+        length = 0
+        for o in ops:
+            if o.get('insert') is None or o.get('delete') is not None or o.get('retain') is not None:
+                raise ValueError('document delta must contain only inserts')
+            insert = o['insert']
+            if isinstance(insert, str) and op.utf16_len(newline) == 1:
+                newlines.extend(length + offset for offset in _newline_offsets(insert, newline))
+            length += op.length(o)
+        return cls(newlines, length, newline)
+
+    def __len__(self):
+        return len(self.newlines) + (0 if self.is_canonical() else 1)
+
+    def __eq__(self, other):
+        if not isinstance(other, BlockIndex):
+            return NotImplemented
+        return (self.newlines == other.newlines
+                and self.length == other.length
+                and self.newline == other.newline)
+
+    def __repr__(self):
+        return f'BlockIndex({self.newlines}, {self.length})'
+
+    def is_canonical(self):
+        """Whether the document ends with a newline."""
+        return bool(self.newlines) and self.newlines[-1] == self.length - 1
+
+    def compose(self, change):
+        """Return the index of the document after ``change`` is applied."""
+        ops = change.ops if hasattr(change, 'ops') else change
+        newlines = self.newlines
+        result = []
+        cursor = 0
+        shift = 0
+        pos = 0
+        for o in ops:
+            op_type = op.type(o)
+            length = op.length(o)
+            if op_type == 'insert':
+                if isinstance(o['insert'], str) and op.utf16_len(self.newline) == 1:
+                    result.extend(cursor + shift + offset
+                                  for offset in _newline_offsets(o['insert'], self.newline))
+                shift += length
+                continue
+            length = min(length, self.length - cursor)
+            end = bisect_left(newlines, cursor + length, pos)
+            if op_type == 'retain':
+                if shift:
+                    result.extend(offset + shift for offset in newlines[pos:end])
+                else:
+                    result.extend(newlines[pos:end])
+            else:
+                shift -= length
+            pos = end
+            cursor += length
+        if shift:
+            result.extend(offset + shift for offset in newlines[pos:])
+        else:
+            result.extend(newlines[pos:])
+        return BlockIndex(result, self.length + shift, self.newline)
+
+    def block_at(self, offset):
+        """Index of the block containing ``offset`` (its newline included)."""
+        return min(bisect_left(self.newlines, offset), len(self) - 1)
+
+    def span(self, block):
+        """The ``{'from', 'to'}`` span of ``block``, newline included."""
+        if block < 0 or block >= len(self):
+            raise IndexError(f'block index out of range: {block}')
+        start = self.newlines[block - 1] + 1 if block else 0
+        end = self.newlines[block] + 1 if block < len(self.newlines) else self.length + 1
+        return {'from': start, 'to': end}
+
+    def spans(self):
+        return [self.span(block) for block in range(len(self))]
+
+    def boundaries(self):
+        """Offsets where blocks start, plus the end of the last block."""
+        boundaries = [0] + [offset + 1 for offset in self.newlines]
+        if not self.is_canonical():
+            boundaries.append(self.length + 1)
+        return boundaries
+
+    def is_boundary(self, offset):
+        if offset == 0:
+            return True
+        if not self.is_canonical() and offset == self.length + 1:
+            return True
+        found = bisect_left(self.newlines, offset - 1)
+        return found < len(self.newlines) and self.newlines[found] == offset - 1
+
+    def has_newline(self, start, end):
+        """Whether any newline lies in ``[start, end)``."""
+        return bisect_left(self.newlines, start) < bisect_right(self.newlines, end - 1)
@@ -1,17 +1,11 @@
 """
 Classify how a delta interacts with block boundaries.
 """
-from .base import Delta
-from .labeled_state import assert_canonical_document, flatten_document_units
-from .project import block_boundaries
+from .labeled_state import assert_canonical_document
 
 
-def _is_newline_value(value, newline):
-    return isinstance(value, str) and value == newline
-
-
-def _flatten_inserted_units(value, attributes=None):
-    return flatten_document_units(Delta().insert(value, **(attributes or {})))
+def _contains_newline(value, newline):
+    return isinstance(value, str) and newline in value
 
 
 def classify_delta_boundaries(document, delta, newline='\n'):
@@ -21,8 +15,7 @@ def classify_delta_boundaries(document, delta, newline='\n'):
     """
     assert_canonical_document(document, newline)
 
-    base_units = flatten_document_units(document)
-    boundaries = set(block_boundaries(document, newline))
+    index = document.block_index(newline)
     cursor = 0
     structural = False
     split_merge = False
@@ -33,17 +26,18 @@ def classify_delta_boundaries(document, delta, newline='\n'):
         nonlocal structural, split_merge, pending_insert
         if not pending_insert:
             return
-        contains_newline = any(_is_newline_value(u['value'], newline) for u in pending_insert)
-        if contains_newline:
+        if any(_contains_newline(value, newline) for value in pending_insert):
             structural = True
-            ends_with_newline = _is_newline_value(pending_insert[-1]['value'], newline)
-            if pending_insert_at not in boundaries or not ends_with_newline:
+            ends_with_newline = (isinstance(pending_insert[-1], str)
+                                 and pending_insert[-1].endswith(newline))
+            if not index.is_boundary(pending_insert_at) or not ends_with_newline:
                 split_merge = True
         pending_insert = []
 
     for o in delta.ops:
         if o.get('insert') is not None:
-            pending_insert.extend(_flatten_inserted_units(o['insert'], o.get('attributes')))
+            if o['insert'] != '':
+                pending_insert.append(o['insert'])
             continue
 
         flush_insert()
@@ -51,10 +45,9 @@ def classify_delta_boundaries(document, delta, newline='\n'):
         if isinstance(o.get('delete'), int):
             start = cursor
             end = cursor + o['delete']
-            deleted = base_units[start:end]
-            if any(_is_newline_value(u['value'], newline) for u in deleted):
+            if index.has_newline(start, min(end, index.length)):
                 structural = True
-                if start not in boundaries or end not in boundaries:
+                if not index.is_boundary(start) or not index.is_boundary(end):
                     split_merge = True
             cursor = end
             pending_insert_at = cursor
@@ -7,6 +7,7 @@ from functools import reduce
 from .base import Delta
 from .block import BlockDelta, diff_to_moves, normalize_move, resolve_move
 from .boundary_classifier import classify_delta_boundaries
+from .change_cache import ChangeCache
 from .labeled_state import (
     assert_canonical_document,
     attach_resolved_move_block_identity,
@@ -20,16 +21,16 @@ from .labeled_state import (
     labeled_state_from_document,
     labeled_state_to_delta,
     max_unit_id,
-    rebuild_labeled_state,
     replay_resolved_delta,
     resolve_delta_against_state,
     same_gap_anchor,
+    _StateBuilder,
     _find_gap_edge_index,
     _after_whole_line_prefix_index,
     _unit_was_inserted_at_gap,
     _descendant_run_start,
 )
-from .project import block_boundary_gap_anchors, project_labeled_block_spans
+from .project import project_labeled_block_ranges
 
 
 # ── Clone helpers ──
@@ -78,22 +79,21 @@ def _is_boundary_index(state, gap_index, newline='\n'):
     if gap_index == 0:
         return True
     return (gap_index > 0
-            and gap_index <= len(state['units'])
-            and _is_newline_unit(state['units'][gap_index - 1]['value'], newline))
+            and gap_index <= len(state)
+            and _is_newline_unit(state.value(gap_index - 1), newline))
 
 
 def _boundary_from_gap(state, gap, gap_index):
     return {
         'gap': _clone_gap_anchor(gap),
-        'newlineUnit': clone_labeled_unit(state['units'][gap_index - 1]) if gap_index > 0 else None,
+        'newlineUnit': state.unit(gap_index - 1) if gap_index > 0 else None,
     }
 
 
 def _block_identity(state, from_idx, to_idx, newline='\n'):
-    if to_idx <= from_idx or to_idx > len(state['units']):
+    if to_idx <= from_idx or to_idx > len(state):
         return None
-    unit = state['units'][to_idx - 1]
-    return unit['id'] if _is_newline_unit(unit['value'], newline) else None
+    return state.unit_id(to_idx - 1) if _is_newline_unit(state.value(to_idx - 1), newline) else None
 
 
 def _split_inserted_fragment(units, newline='\n'):
@@ -110,10 +110,7 @@ def _split_inserted_fragment(units, newline='\n'):
 def _insert_units_at_index(state, index, units):
     if not units:
         return clone_labeled_state(state)
-    next_units = state['units'][:]
-    for i, u in enumerate(units):
-        next_units.insert(index + i, clone_labeled_unit(u))
-    return rebuild_labeled_state(next_units)
+    return state.insert_units(index, units)
 
 
 def _restore_boundary(state, boundary, edge, newline='\n', preferred_unit_id=None):
@@ -122,44 +119,38 @@ def _restore_boundary(state, boundary, edge, newline='\n', preferred_unit_id=Non
         return {'state': state, 'restored': False, 'restoredUnitId': None}
     restored_unit = clone_labeled_unit(boundary['newlineUnit'])
     restored_unit['id'] = max_unit_id(state) + 1 if preferred_unit_id is None else preferred_unit_id
-    units = state['units'][:]
-    units.insert(gap_index, restored_unit)
-    return {'state': rebuild_labeled_state(units), 'restored': True, 'restoredUnitId': restored_unit['id']}
+    return {'state': state.insert_units(gap_index, [restored_unit]), 'restored': True, 'restoredUnitId': restored_unit['id']}
 
 
 def _materialize_boundary_gap_index(state, boundary, edge, restored_unit_id):
     if restored_unit_id is None:
         return _find_gap_edge_index(state, boundary['gap'], edge, '\n')
-    for i, u in enumerate(state['units']):
-        if u['id'] == restored_unit_id:
-            return i + 1
+    index = state.index_of(restored_unit_id)
+    if index >= 0:
+        return index + 1
     raise ValueError('restored boundary unit not found in current state')
 
 
 def _resolve_block_move_on_state(state, index, move):
-    blocks = project_labeled_block_spans(state)
+    blocks = project_labeled_block_ranges(state)
     resolved = normalize_move(resolve_move(index, move['count'], move['before']), len(blocks))
     if resolved is None:
         return None
-    boundary_anchors = block_boundary_gap_anchors(state)
-    left_gap = blocks[resolved['index']]['leftGap']
-    right_gap = blocks[resolved['index'] + resolved['count'] - 1]['rightGap']
-    before_gap = boundary_anchors[resolved['before']]
+    left_index = blocks[resolved['index']][0]
+    right_index = blocks[resolved['index'] + resolved['count'] - 1][1]
+    before_index = 0 if resolved['before'] == 0 else blocks[resolved['before'] - 1][1]
     resolved_move = {
-        'left': _boundary_from_gap(state, left_gap,
-                                   0 if resolved['index'] == 0 else blocks[resolved['index']]['from']),
-        'right': _boundary_from_gap(state, right_gap,
-                                    blocks[resolved['index'] + resolved['count'] - 1]['to']),
-        'before': _boundary_from_gap(state, before_gap,
-                                     0 if resolved['before'] == 0 else blocks[resolved['before'] - 1]['to']),
+        'left': _boundary_from_gap(state, state.gap(left_index), 0 if resolved['index'] == 0 else left_index),
+        'right': _boundary_from_gap(state, state.gap(right_index), right_index),
+        'before': _boundary_from_gap(state, state.gap(before_index), before_index),
     }
     source_block_ids = [
-        _block_identity(state, b['from'], b['to'])
-        for b in blocks[resolved['index']:resolved['index'] + resolved['count']]
+        _block_identity(state, from_idx, to_idx)
+        for from_idx, to_idx in blocks[resolved['index']:resolved['index'] + resolved['count']]
     ]
     source_block_ids = [bid for bid in source_block_ids if bid is not None]
     before_block_id = (
-        _block_identity(state, blocks[resolved['before']]['from'], blocks[resolved['before']]['to'])
+        _block_identity(state, *blocks[resolved['before']])
         if resolved['before'] < len(blocks) else None
     )
     return attach_resolved_move_block_identity(resolved_move, source_block_ids, before_block_id)
@@ -171,8 +162,8 @@ def _materialize_move_by_block_identity(state, move, destination_edge, newline='
     source_block_ids = get_resolved_move_source_block_ids(move)
     if not source_block_ids:
         return None
-    blocks = project_labeled_block_spans(state, newline)
-    block_ids = [_block_identity(state, b['from'], b['to'], newline) for b in blocks]
+    blocks = project_labeled_block_ranges(state, newline)
+    block_ids = [_block_identity(state, from_idx, to_idx, newline) for from_idx, to_idx in blocks]
     try:
         start_index = block_ids.index(source_block_ids[0])
     except ValueError:
@@ -190,9 +181,9 @@ def _materialize_move_by_block_identity(state, move, destination_edge, newline='
             before_block_index = block_ids.index(before_block_id)
         except ValueError:
             return None
-    start = blocks[start_index]['from']
-    end = blocks[start_index + len(source_block_ids) - 1]['to']
-    before = len(state['units']) if before_block_index == len(blocks) else blocks[before_block_index]['from']
+    start = blocks[start_index][0]
+    end = blocks[start_index + len(source_block_ids) - 1][1]
+    before = len(state) if before_block_index == len(blocks) else blocks[before_block_index][0]
     return {
         'start': start, 'end': end, 'before': before,
         'noop': start_index <= before_block_index <= start_index + len(source_block_ids),
@@ -246,18 +237,11 @@ def _replay_boundary_restoration(state, restoration, newline='\n'):
 
 
 def _same_labeled_state(left, right):
-    import json
-    return json.dumps([u for u in left['units'] if not u.get('_origin_gap')],
-                      default=str) == json.dumps([u for u in right['units'] if not u.get('_origin_gap')], default=str)
+    return left.same_units(right, skip_inserted=True)
 
 
 def _same_labeled_state_units(left, right):
-    if len(left['units']) != len(right['units']):
-        return False
-    for l, r in zip(left['units'], right['units']):
-        if l['id'] != r['id'] or l['value'] != r['value'] or l.get('attributes') != r.get('attributes'):
-            return False
-    return True
+    return left.same_units(right)
 
 
 # ── Public replay API ──
@@ -267,12 +251,16 @@ def replay_resolved_block_move(state, move, newline='\n', options=None):
     exact = materialized['exact']
     if exact['noop']:
         return {'state': materialized['state'], 'restorations': materialized['restorations']}
-    moved = [clone_labeled_unit(u) for u in materialized['state']['units'][exact['start']:exact['end']]]
-    remaining = [clone_labeled_unit(u) for u in
-                 materialized['state']['units'][:exact['start']] + materialized['state']['units'][exact['end']:]]
-    insertion_index = exact['before'] if exact['before'] < exact['start'] else exact['before'] - (exact['end'] - exact['start'])
-    reordered = remaining[:insertion_index] + moved + remaining[insertion_index:]
-    return {'state': rebuild_labeled_state(reordered), 'restorations': materialized['restorations']}
+    working = materialized['state']
+    start, end, before = exact['start'], exact['end'], exact['before']
+    reordered = _StateBuilder()
+    if before < start:
+        ranges = ((0, before), (start, end), (before, start), (end, None))
+    else:
+        ranges = ((0, start), (end, before), (start, end), (before, None))
+    for lo, hi in ranges:
+        reordered.extend(working, lo, hi)
+    return {'state': reordered.build(), 'restorations': materialized['restorations']}
 
 
 def replay_resolved_block_moves(state, moves, newline='\n', options=None):
@@ -296,7 +284,7 @@ def ensure_resolved_block_moves(state, moves, newline='\n', destination_edge='be
 def resolve_block_delta(state, block_delta, newline='\n'):
     resolved_moves = []
     working = clone_labeled_state(state)
-    for move in block_delta.resolve(len(project_labeled_block_spans(state, newline))):
+    for move in block_delta.resolve(_block_count(state, newline)):
         resolved = _resolve_block_move_on_state(working, move['index'], {'count': move['count'], 'before': move['before']})
         if resolved is None:
             continue
@@ -317,14 +305,30 @@ def _final_state_of(resolved, newline='\n'):
 
 
 def _block_count(state, newline='\n'):
-    return len(project_labeled_block_spans(state, newline))
+    return len(project_labeled_block_ranges(state, newline))
 
 
 def _delta_only_change(from_state, to_state):
     return {'delta': labeled_state_to_delta(from_state).diff(labeled_state_to_delta(to_state)), 'blockDelta': BlockDelta()}
 
 
-def _lower_exactly_or_fallback(initial_state, exact_final_state, candidate, newline='\n'):
+def _lower_exactly_or_fallback(initial_state, exact_final_state, lowered, newline='\n', verification='verify'):
+    """
+    Return the lowered change if applying it to ``initial_state`` reproduces
+    ``exact_final_state``, else a plain delta between the two. ``lowered`` is
+    a ``(candidate, exact_from)`` pair, where ``exact_from`` is the state the
+    candidate is the plain delta from, or None.
+
+    'verify' always replays the candidate. 'trust' skips the replay for a
+    plain delta from ``initial_state`` itself and for a pure block reorder,
+    but still projects the states into blocks, so a state without a final
+    newline raises either way.
+    """
+    candidate, exact_from = lowered
+    if verification == 'trust' and (exact_from is initial_state or not candidate['delta'].ops):
+        _block_count(initial_state, newline)
+        _block_count(exact_final_state, newline)
+        return candidate
     candidate_final_state = _final_state_of(_resolve_change_against_state(initial_state, candidate, newline), newline)
     if _same_document_state(candidate_final_state, exact_final_state):
         return candidate
@@ -393,7 +397,7 @@ def _rekey_resolved_change_against_state(resolved, state):
             'deletedUnitIds': resolved['resolvedDelta']['deletedUnitIds'][:],
             'formatPatchesByUnitId': [{'unitId': p['unitId'], 'attributes': copy.deepcopy(p['attributes'])} for p in resolved['resolvedDelta']['formatPatchesByUnitId']],
         },
-        'postDeltaState': rebuild_labeled_state([remap_unit(u) for u in resolved['postDeltaState']['units']]),
+        'postDeltaState': resolved['postDeltaState'].remap_ids(unit_id_map),
         'resolvedMoves': [
             (lambda m: (
                 attach_resolved_move_block_identity(m,
@@ -412,8 +416,8 @@ def _rekey_resolved_change_against_state(resolved, state):
 
 def _block_order_keys(state, newline='\n'):
     return [
-        ','.join(str(u['id']) for u in state['units'][b['from']:b['to']])
-        for b in project_labeled_block_spans(state, newline)
+        ','.join(map(str, state.unit_ids(from_idx, to_idx)))
+        for from_idx, to_idx in project_labeled_block_ranges(state, newline)
     ]
 
 
@@ -431,8 +435,9 @@ def _lower_change(from_state, post_delta_state, final_state, newline='\n'):
     final_doc = labeled_state_to_delta(final_state)
     block_delta = _try_lower_block_delta(post_delta_state, final_state, newline)
     if block_delta is None:
-        return {'delta': from_doc.diff(final_doc), 'blockDelta': BlockDelta()}
-    return {'delta': from_doc.diff(post_delta_doc), 'blockDelta': block_delta}
+        return {'delta': from_doc.diff(final_doc), 'blockDelta': BlockDelta()}, from_state
+    exact = not block_delta.ops and post_delta_doc.ops == final_doc.ops
+    return {'delta': from_doc.diff(post_delta_doc), 'blockDelta': block_delta}, from_state if exact else None
 
 
 # ── Prepare ──
@@ -476,9 +481,7 @@ def _insert_boundary_at_gap(state, restoration, gap_index):
         return clone_labeled_state(state)
     restored_unit = clone_labeled_unit(restoration['boundary']['newlineUnit'])
     restored_unit['id'] = restoration.get('restoredUnitId') or max_unit_id(state) + 1
-    units = state['units'][:]
-    units.insert(gap_index, restored_unit)
-    return rebuild_labeled_state(units)
+    return state.insert_units(gap_index, [restored_unit])
 
 
 def _pull_back_required_boundary(pre_move_state, required, prior_steps, current_step_state, target_state, newline='\n'):
@@ -487,13 +490,42 @@ def _pull_back_required_boundary(pre_move_state, required, prior_steps, current_
     if (required.get('edge') == 'after'
             and not classify_gap_descendants(current_step_state, required['boundary']['gap'], newline)['afterEdgeBlockExpressible']):
         return {'state': clone_labeled_state(pre_move_state), 'found': False}
-    for gap_index in range(len(pre_move_state['units']) + 1):
+    for gap_index in _pull_back_candidates(pre_move_state, target_state, required.get('restoredUnitId')):
         candidate = _insert_boundary_at_gap(pre_move_state, required, gap_index)
         if _same_labeled_state_units(_replay_prepared_prefix(candidate, prior_steps, newline), target_state):
             return {'state': candidate, 'found': True}
     return {'state': clone_labeled_state(pre_move_state), 'found': False}
 
 
+def _pull_back_candidates(pre_move_state, target_state, unit_id):
+    """
+    Gaps of ``pre_move_state`` next to the nearest units that neighbour
+    ``unit_id`` in ``target_state``. Block moves carry units along with
+    their neighbours, so the restored boundary pulls back to one of these;
+    when neither replays to ``target_state``, the moves are lowered as a
+    plain delta instead of searching every gap.
+    """
+    index = target_state.index_of(unit_id)
+    if index < 0:
+        return []
+    candidates = []
+    for left in range(index - 1, -1, -1):
+        found = pre_move_state.index_of(target_state.unit_id(left))
+        if found >= 0:
+            candidates.append(found + 1)
+            break
+    else:
+        candidates.append(0)
+    for right in range(index + 1, len(target_state)):
+        found = pre_move_state.index_of(target_state.unit_id(right))
+        if found >= 0:
+            candidates.append(found)
+            break
+    else:
+        candidates.append(len(pre_move_state))
+    return sorted(set(candidates))
+
+
 def _prepare_resolved_block_moves(initial_state, move_initial_state, moves, newline='\n', choose_destination_edge=None):
     if choose_destination_edge is None:
         choose_destination_edge = lambda _s, _m, _i: 'before'
@@ -543,63 +575,94 @@ def _prepare_resolved_block_moves(initial_state, move_initial_state, moves, newl
 
 def _lower_prepared_move_program(program, newline='\n'):
     if not program['expressibleAsBlockDelta']:
-        return {
-            'delta': labeled_state_to_delta(program['initialState']).diff(labeled_state_to_delta(program['finalState'])),
-            'blockDelta': BlockDelta(),
-        }
+        return _delta_only_change(program['initialState'], program['finalState']), program['initialState']
     block_delta = _try_lower_block_delta(program['preMoveState'], program['finalState'], newline)
     if block_delta is None:
-        return {
-            'delta': labeled_state_to_delta(program['initialState']).diff(labeled_state_to_delta(program['finalState'])),
-            'blockDelta': BlockDelta(),
-        }
+        return _delta_only_change(program['initialState'], program['finalState']), program['initialState']
     return {
         'delta': labeled_state_to_delta(program['initialState']).diff(labeled_state_to_delta(program['preMoveState'])),
         'blockDelta': block_delta,
-    }
+    }, None
 
 
-def _prepare_and_lower(initial_state, move_initial_state, moves, exact_final_state, newline='\n', choose_destination_edge=None):
+def _prepare_and_lower(initial_state, move_initial_state, moves, exact_final_state, newline='\n',
+                       choose_destination_edge=None, verification='verify'):
     try:
         prepared = _prepare_resolved_block_moves(initial_state, move_initial_state, moves, newline, choose_destination_edge)
         if _same_document_state(prepared['finalState'], exact_final_state):
             return _lower_exactly_or_fallback(
-                initial_state, exact_final_state, _lower_prepared_move_program(prepared, newline), newline)
+                initial_state, exact_final_state, _lower_prepared_move_program(prepared, newline), newline,
+                verification)
     except Exception:
         pass
     return _delta_only_change(initial_state, exact_final_state)
 
 
 def _same_document_state(left, right):
-    return labeled_state_to_delta(left).ops == labeled_state_to_delta(right).ops
+    return left.same_document(right)
 
 
 # ── Public operations ──
 
+# How compose_change, transform_change and invert_change check a lowered
+# change before returning it, chosen with their ``verification`` argument:
+# 'verify' replays it through the bridge and falls back to a plain delta
+# unless it reproduces the exact final state. 'trust' skips the replay for
+# a plain delta from the operation's own initial state and for pure block
+# reorders, which diff_to_moves only produces for permutations of the same
+# blocks.
+LOWERING_VERIFICATION_MODES = ('verify', 'trust')
+
+
+def _check_verification(verification):
+    if verification not in LOWERING_VERIFICATION_MODES:
+        raise ValueError(f'unknown lowering verification mode: {verification!r}')
+
+# Labeled states and resolutions shared by the operations below, keyed by
+# document ``cache_token()``. Call ``resolution_cache.invalidate(document)``
+# after editing a document's ops in place.
+resolution_cache = ChangeCache()
+
+
+def _document_state(document, newline):
+    return resolution_cache.state(document, newline, lambda: labeled_state_from_document(document, newline))
+
+
+def _document_resolved(document, base_state, change, newline):
+    return resolution_cache.resolved(
+        document, change, newline, lambda: _resolve_change_against_state(base_state, change, newline))
+
+
+def _document_final_state(document, base_state, change, newline):
+    return resolution_cache.final_state(
+        document, change, newline,
+        lambda: _final_state_of(_document_resolved(document, base_state, change, newline), newline))
+
 def resolve_change(document, change, newline='\n'):
     assert_canonical_document(document, newline)
-    return _resolve_change_against_state(labeled_state_from_document(document, newline), change, newline)
+    return _resolve_change_against_state(_document_state(document, newline), change, newline)
 
 
 def apply_change(document, change, newline='\n'):
     assert_canonical_document(document, newline)
     if not change['blockDelta'].ops:
         return document.compose(change['delta'])
-    base_state = labeled_state_from_document(document, newline)
-    return labeled_state_to_delta(_final_state_of(_resolve_change_against_state(base_state, change, newline), newline))
+    base_state = _document_state(document, newline)
+    return labeled_state_to_delta(_document_final_state(document, base_state, change, newline))
 
 
-def compose_change(document, first, second, newline='\n'):
+def compose_change(document, first, second, newline='\n', verification='verify'):
+    _check_verification(verification)
     assert_canonical_document(document, newline)
-    base_state = labeled_state_from_document(document, newline)
+    base_state = _document_state(document, newline)
 
     if not first['delta'].ops and not second['delta'].ops:
         return {'delta': Delta(), 'blockDelta': first['blockDelta'].compose(second['blockDelta'], _block_count(base_state, newline))}
     if not first['blockDelta'].ops and not second['blockDelta'].ops:
         return {'delta': first['delta'].compose(second['delta']), 'blockDelta': BlockDelta()}
 
-    first_resolved = _resolve_change_against_state(base_state, first, newline)
-    first_final = _final_state_of(first_resolved, newline)
+    first_resolved = _document_resolved(document, base_state, first, newline)
+    first_final = _document_final_state(document, base_state, first, newline)
     second_resolved = _resolve_change_against_state(first_final, second, newline)
     sequential_final = _final_state_of(second_resolved, newline)
 
@@ -611,66 +674,147 @@ def compose_change(document, first, second, newline='\n'):
     if not combined_moves:
         return _lower_exactly_or_fallback(
             base_state, sequential_final,
-            _lower_change(base_state, combined_post_delta, sequential_final, newline), newline)
+            _lower_change(base_state, combined_post_delta, sequential_final, newline), newline, verification)
 
-    return _prepare_and_lower(base_state, combined_post_delta, combined_moves, sequential_final, newline)
+    return _prepare_and_lower(base_state, combined_post_delta, combined_moves, sequential_final, newline,
+                              verification=verification)
 
 
-def transform_change(left, right, document, priority=False, newline='\n'):
-    assert_canonical_document(document, newline)
-    base_state = labeled_state_from_document(document, newline)
+def _transform_by_diff(left, right, left_prime, document, newline='\n'):
+    # ``right`` transformed against ``left`` as the plain delta between the
+    # document after ``left`` and the one both sides converge on.
+    converged = apply_change(apply_change(document, right, newline), left_prime, newline)
+    return {'delta': apply_change(document, left, newline).diff(converged), 'blockDelta': BlockDelta()}
+
 
+def transform_change(left, right, document, priority=False, newline='\n', verification='verify'):
+    _check_verification(verification)
+    assert_canonical_document(document, newline)
     if not left['blockDelta'].ops and not right['blockDelta'].ops:
         return {'delta': left['delta'].transform(right['delta'], priority), 'blockDelta': BlockDelta()}
+
+    base_state = _document_state(document, newline)
     if not left['delta'].ops and not right['delta'].ops:
         return {'delta': Delta(), 'blockDelta': left['blockDelta'].transform(right['blockDelta'], _block_count(base_state, newline), priority)}
 
     if (left['blockDelta'].ops and right['blockDelta'].ops
             and classify_delta_boundaries(document, left['delta'], newline) == 'block-stable'
             and classify_delta_boundaries(document, right['delta'], newline) == 'block-stable'):
+        right_delta_only = {'delta': right['delta'], 'blockDelta': BlockDelta()}
         return {
-            'delta': transform_change(left, {'delta': right['delta'], 'blockDelta': BlockDelta()}, document, priority, newline)['delta'],
+            'delta': transform_change(left, right_delta_only, document, priority, newline, verification)['delta'],
             'blockDelta': left['blockDelta'].transform(right['blockDelta'], _block_count(base_state, newline), priority),
         }
 
     if left['blockDelta'].ops and not right['blockDelta'].ops:
-        right_final_doc = apply_change(document, right, newline)
-        left_prime = transform_change(right, left, document, not priority, newline)
-        return {
-            'delta': apply_change(document, left, newline).diff(apply_change(right_final_doc, left_prime, newline)),
-            'blockDelta': BlockDelta(),
-        }
+        left_prime = transform_change(right, left, document, not priority, newline, verification)
+        return _transform_by_diff(left, right, left_prime, document, newline)
 
-    left_resolved = _resolve_change_against_state(base_state, left, newline)
-    left_final = _final_state_of(left_resolved, newline)
+    left_final = _document_final_state(document, base_state, left, newline)
     right_resolved = _rekey_resolved_change_against_state(
-        _resolve_change_against_state(base_state, right, newline), left_final)
+        _document_resolved(document, base_state, right, newline), left_final)
     transformed_post_delta = _replay_resolved_delta_with_insert_edge(
         left_final, right_resolved['resolvedDelta'], 'after' if priority else 'before')
 
     if not right_resolved['resolvedMoves']:
         return _lower_exactly_or_fallback(
             left_final, transformed_post_delta,
-            _lower_change(left_final, transformed_post_delta, transformed_post_delta, newline), newline)
+            _lower_change(left_final, transformed_post_delta, transformed_post_delta, newline), newline, verification)
 
     prepared = _prepare_resolved_block_moves(
         left_final, transformed_post_delta, right_resolved['resolvedMoves'], newline,
         lambda _s, _m, _i: 'after' if priority else 'before')
     return _lower_exactly_or_fallback(
-        left_final, prepared['finalState'], _lower_prepared_move_program(prepared, newline), newline)
+        left_final, prepared['finalState'], _lower_prepared_move_program(prepared, newline), newline, verification)
+
+
+def transform_change_pair(left, right, document, priority=False, newline='\n', verification='verify'):
+    """
+    Transform two concurrent changes against each other.
+
+    Returns ``(transform_change(left, right, document, priority),
+    transform_change(right, left, document, not priority))``. Both sides share
+    the labeled state of ``document`` and the resolution of each change, and
+    when only one side has block moves, the other side's result is derived
+    from it rather than transformed a second time.
+    """
+    _check_verification(verification)
+    assert_canonical_document(document, newline)
+    if not left['blockDelta'].ops and not right['blockDelta'].ops:
+        right_prime, left_prime = left['delta'].transform_pair(right['delta'], priority)
+        return {'delta': right_prime, 'blockDelta': BlockDelta()}, {'delta': left_prime, 'blockDelta': BlockDelta()}
+    if not left['delta'].ops and not right['delta'].ops:
+        block_count = _block_count(_document_state(document, newline), newline)
+        return (
+            {'delta': Delta(), 'blockDelta': left['blockDelta'].transform(right['blockDelta'], block_count, priority)},
+            {'delta': Delta(), 'blockDelta': right['blockDelta'].transform(left['blockDelta'], block_count, not priority)},
+        )
+    if left['blockDelta'].ops and not right['blockDelta'].ops:
+        left_prime = transform_change(right, left, document, not priority, newline, verification)
+        return _transform_by_diff(left, right, left_prime, document, newline), left_prime
+    if right['blockDelta'].ops and not left['blockDelta'].ops:
+        right_prime = transform_change(left, right, document, priority, newline, verification)
+        return right_prime, _transform_by_diff(right, left, right_prime, document, newline)
+    return (transform_change(left, right, document, priority, newline, verification),
+            transform_change(right, left, document, not priority, newline, verification))
+
+
+def _transform_delta_run(run, change, priority):
+    if not run:
+        return change
+    return {'delta': Delta.transform_many(run, change['delta'], priority), 'blockDelta': BlockDelta()}
+
+
+def transform_change_against_history(change, history, document, priority=False, newline='\n', verification='verify'):
+    """
+    Transform ``change`` against ``history``, the changes applied to
+    ``document`` in order since ``change`` was made.
+
+    Equivalent to transforming against each history change in turn while
+    applying it to the document. While ``change`` has no block moves, runs of
+    delta-only history changes go through ``Delta.transform_many``, and the
+    document is only brought forward, composing such runs at once, when a
+    change with block moves has to be transformed against it. Its block
+    index is kept up to date throughout, so a history that leaves the
+    document without a final newline raises as the step-by-step version does.
+    """
+    _check_verification(verification)
+    index = document.block_index(newline)
+    pending = []
+    run = []
+    for prior in history:
+        if not index.is_canonical():
+            raise ValueError('canonical document delta must end with a final newline')
+        if not prior['blockDelta'].ops and not change['blockDelta'].ops:
+            run.append(prior['delta'])
+        else:
+            change = _transform_delta_run(run, change, priority)
+            run = []
+            if pending:
+                document = Delta.compose_many([document] + pending)
+                pending = []
+            change = transform_change(prior, change, document, priority, newline, verification)
+        if prior['blockDelta'].ops:
+            document = apply_change(document, prior, newline)
+            index = document.block_index(newline)
+        else:
+            pending.append(prior['delta'])
+            index = index.compose(prior['delta'])
+    return _transform_delta_run(run, change, priority)
 
 
-def invert_change(document, change, newline='\n'):
+def invert_change(document, change, newline='\n', verification='verify'):
+    _check_verification(verification)
     assert_canonical_document(document, newline)
-    base_state = labeled_state_from_document(document, newline)
+    base_state = _document_state(document, newline)
 
     if not change['delta'].ops:
         return {'delta': Delta(), 'blockDelta': change['blockDelta'].invert(_block_count(base_state, newline))}
     if not change['blockDelta'].ops:
         return {'delta': change['delta'].invert(document), 'blockDelta': BlockDelta()}
 
-    resolved = _resolve_change_against_state(base_state, change, newline)
-    final_state = _final_state_of(resolved, newline)
+    resolved = _document_resolved(document, base_state, change, newline)
+    final_state = _document_final_state(document, base_state, change, newline)
     inverse_resolved_delta = resolve_delta_against_state(resolved['postDeltaState'], change['delta'].invert(document))
     inverse_post_delta = replay_resolved_delta(final_state, inverse_resolved_delta)
     inverse_block_delta = _try_lower_block_delta(inverse_post_delta, base_state, newline)
@@ -680,4 +824,4 @@ def invert_change(document, change, newline='\n'):
     return _prepare_and_lower(
         final_state, inverse_post_delta,
         resolve_block_delta(inverse_post_delta, inverse_block_delta, newline),
-        base_state, newline)
+        base_state, newline, verification=verification)
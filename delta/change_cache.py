@@ -0,0 +1,84 @@
+"""
+Bounded LRU cache for the change bridge.
+
+Every bridge operation builds the labeled state of its document and resolves
+its changes against it. A server that transforms an incoming change against
+its backlog and then applies it repeats that work for the same document and
+change, so the cache keeps labeled states, resolved changes and their final
+states, keyed by the document's ``cache_token()`` and a structural
+fingerprint of the change.
+"""
+from collections import OrderedDict
+from collections.abc import Mapping
+
+
+def _freeze(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, Mapping):
+        # Compact ops and interned attribute maps fingerprint like their dicts
+        return (dict, tuple(sorted((key, _freeze(item)) for key, item in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (list, tuple(_freeze(item) for item in value))
+    # Keep True, 1 and 1.0 apart: they hash alike but lower differently
+    return (value.__class__, value)
+
+
+def change_fingerprint(change):
+    """A hashable structural fingerprint of a ``{'delta', 'blockDelta'}`` change."""
+    return _freeze(change['delta'].ops), _freeze(change['blockDelta'].ops)
+
+
+class ChangeCache:
+    """
+    LRU cache of labeled states, resolved changes and final states.
+
+    At most ``maxsize`` entries are kept; 0 disables caching. ``hits`` and
+    ``misses`` count lookups since the last ``clear()``. Cached values are
+    shared between callers and must not be mutated.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def _get(self, key, build):
+        entries = self._entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+        self.misses += 1
+        value = build()
+        if self.maxsize > 0:
+            entries[key] = value
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+        return value
+
+    def state(self, document, newline, build):
+        return self._get((document.cache_token(), newline, 'state'), build)
+
+    def resolved(self, document, change, newline, build):
+        return self._get((document.cache_token(), newline, 'resolved', change_fingerprint(change)), build)
+
+    def final_state(self, document, change, newline, build):
+        return self._get((document.cache_token(), newline, 'final', change_fingerprint(change)), build)
+
+    def invalidate(self, document):
+        """Drop every entry for ``document``."""
+        token = document.cache_token()
+        for key in [key for key in self._entries if key[0] is token]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
@@ -2,12 +2,16 @@
 Labeled state: unit-level document model with gap anchors for OT resolution.
 """
 import copy
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, zip_longest
+from collections.abc import Sequence
 
 from . import op as op_module
 
 
 def _clone_attributes(attributes=None):
-    return copy.deepcopy(attributes or {})
+    # dict() first: deepcopy hands back interned attribute maps unchanged
+    return copy.deepcopy(dict(attributes or {}))
 
 
 def _clone_value(value):
@@ -85,19 +89,13 @@ def flatten_document_units(document):
 
 def is_canonical_document(document, newline='\n'):
     try:
-        units = flatten_document_units(document)
-        return (len(units) > 0
-                and isinstance(units[-1]['value'], str)
-                and units[-1]['value'] == newline)
+        return document.block_index(newline).is_canonical()
     except Exception:
         return False
 
 
 def assert_canonical_document(document, newline='\n'):
-    units = flatten_document_units(document)
-    if (len(units) == 0
-            or not isinstance(units[-1]['value'], str)
-            or units[-1]['value'] != newline):
+    if not document.block_index(newline).is_canonical():
         raise ValueError('canonical document delta must end with a final newline')
 
 
@@ -112,28 +110,461 @@ def canonicalize_document(document, newline='\n'):
     return canonical
 
 
-def _build_gap_anchors(units):
-    gaps = [{
-        'gapId': 0,
-        'afterUnitId': None,
-        'beforeUnitId': units[0]['id'] if units else None,
-    }]
-    for i, unit in enumerate(units):
-        gaps.append({
-            'gapId': i + 1,
-            'afterUnitId': unit['id'],
-            'beforeUnitId': units[i + 1]['id'] if i + 1 < len(units) else None,
-        })
-    return gaps
+class _UnitsView(Sequence):
+    """Read-only ``state['units']``: unit dicts built on access."""
+
+    __slots__ = ('_state',)
+
+    def __init__(self, state):
+        self._state = state
+
+    def __len__(self):
+        return len(self._state)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._state.unit(i) for i in range(*index.indices(len(self._state)))]
+        if index < 0:
+            index += len(self._state)
+        if not 0 <= index < len(self._state):
+            raise IndexError('unit index out of range')
+        return self._state.unit(index)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, Sequence)) and not isinstance(other, str):
+            return self[:] == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self[:])
+
+
+class _GapsView(Sequence):
+    """Read-only ``state['gaps']``: gap anchors built on access."""
+
+    __slots__ = ('_state',)
+
+    def __init__(self, state):
+        self._state = state
+
+    def __len__(self):
+        return len(self._state) + 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._state.gap(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('gap index out of range')
+        return self._state.gap(index)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, Sequence)) and not isinstance(other, str):
+            return self[:] == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self[:])
+
+
+def _code_units(text):
+    return text if op_module.is_bmp(text) else ''.join(_split_utf16_code_units(text))
+
+
+class LabeledState:
+    """
+    Labeled units stored as runs.
+
+    Each run is a ``(first_id, value, attributes, origin gap)`` tuple covering
+    units with consecutive ids. ``value`` is a string holding one unit per
+    character, or a one-item tuple holding an embed. Gaps are implicit: gap
+    ``i`` sits between units ``i - 1`` and ``i``. Runs only split where an
+    edit, format patch or move boundary lands inside them, so the size of a
+    state grows with the number of edits rather than the number of units.
+
+    ``state['units']`` and ``state['gaps']`` are read-only views that build
+    the dict-shaped units and gap anchors on access; ``to_dict()`` returns
+    the plain ``{'units', 'gaps'}`` form, which can be mutated or serialized
+    and is accepted wherever a state is. Run attributes and origin gaps are
+    shared and must not be mutated.
+    """
+
+    __slots__ = ('_runs', '_starts', '_length', '_id_keys', '_id_positions')
+
+    def __init__(self, runs=None):
+        self._runs = runs if runs is not None else []
+        starts = list(accumulate([len(run[1]) for run in self._runs], initial=0))
+        self._length = starts.pop()
+        self._starts = starts
+        self._id_keys = None
+        self._id_positions = None
+
+    @classmethod
+    def from_units(cls, units):
+        builder = _StateBuilder()
+        for unit in units:
+            builder.add_unit(unit)
+        return builder.build()
+
+    @classmethod
+    def from_document(cls, document, newline='\n'):
+        builder = _StateBuilder()
+        next_id = 1
+        for o in document.ops:
+            if o.get('insert') is None or o.get('delete') is not None or o.get('retain') is not None:
+                raise ValueError('document delta must contain only inserts')
+            insert = o['insert']
+            value = _code_units(insert) if isinstance(insert, str) else (copy.deepcopy(insert),)
+            builder.append(next_id, value, _clone_attributes(o.get('attributes')), None)
+            next_id += len(value)
+        if not document.block_index(newline).is_canonical():
+            builder.append(next_id, _code_units(newline), {}, None)
+        return builder.build()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, key):
+        if key == 'units':
+            return _UnitsView(self)
+        if key == 'gaps':
+            return _GapsView(self)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in ('units', 'gaps') else default
+
+    def keys(self):
+        return ['units', 'gaps']
+
+    def __contains__(self, key):
+        return key in ('units', 'gaps')
+
+    def __eq__(self, other):
+        if isinstance(other, LabeledState):
+            if self._runs == other._runs:
+                return True
+            return self._length == other._length and self['units'] == other['units']
+        if isinstance(other, dict):
+            return self['units'] == other.get('units') and self['gaps'] == other.get('gaps')
+        return NotImplemented
+
+    def __repr__(self):
+        return f'LabeledState({self.to_dict()!r})'
+
+    def to_dict(self):
+        """The plain ``{'units', 'gaps'}`` form of this state, built fresh."""
+        return {'units': self['units'][:], 'gaps': self['gaps'][:]}
+
+    def _locate(self, index):
+        if not 0 <= index < self._length:
+            raise IndexError('unit index out of range')
+        position = bisect_right(self._starts, index) - 1
+        return self._runs[position], index - self._starts[position]
+
+    def unit_id(self, index):
+        run, offset = self._locate(index)
+        return run[0] + offset
+
+    def value(self, index):
+        """The value of unit ``index`` (shared, not copied)."""
+        run, offset = self._locate(index)
+        return run[1][offset]
+
+    def attributes(self, index):
+        """The attributes of unit ``index`` (shared, not copied)."""
+        return self._locate(index)[0][2]
+
+    def origin(self, index):
+        """The origin gap of unit ``index`` (shared, not copied), or None."""
+        return self._locate(index)[0][3]
+
+    def unit(self, index):
+        """Unit ``index`` as a freshly built dict."""
+        run, offset = self._locate(index)
+        unit = {
+            'id': run[0] + offset,
+            'value': _clone_value(run[1][offset]),
+            'attributes': _clone_attributes(run[2]),
+        }
+        return _attach_origin_gap(unit, run[3])
+
+    def gap(self, index):
+        return {
+            'gapId': index,
+            'afterUnitId': self.unit_id(index - 1) if index > 0 else None,
+            'beforeUnitId': self.unit_id(index) if index < self._length else None,
+        }
+
+    def unit_ids(self, start=0, stop=None):
+        ids = []
+        for first_id, value, _attributes, _origin in self.pieces(start, stop):
+            ids.extend(range(first_id, first_id + len(value)))
+        return ids
+
+    def _index_ids(self):
+        """
+        Sort the runs by first id, once per state. Unit ids are normally
+        unique; if id ranges overlap, ``_id_positions`` stays None and
+        lookups fall back to scanning the runs in order.
+        """
+        runs = self._runs
+        positions = sorted(range(len(runs)), key=lambda position: runs[position][0])
+        keys = [runs[position][0] for position in positions]
+        for i in range(len(positions) - 1):
+            if keys[i] + len(runs[positions[i]][1]) > keys[i + 1]:
+                positions = None
+                break
+        self._id_keys = keys
+        self._id_positions = positions
+
+    def index_of(self, unit_id):
+        """Index of the unit with ``unit_id``, or -1."""
+        if unit_id is None:
+            return -1
+        if self._id_keys is None:
+            self._index_ids()
+        if self._id_positions is not None:
+            found = bisect_right(self._id_keys, unit_id) - 1
+            if found >= 0:
+                position = self._id_positions[found]
+                offset = unit_id - self._id_keys[found]
+                if offset < len(self._runs[position][1]):
+                    return self._starts[position] + offset
+            return -1
+        for position, run in enumerate(self._runs):
+            offset = unit_id - run[0]
+            if 0 <= offset < len(run[1]):
+                return self._starts[position] + offset
+        return -1
+
+    def last_index_of(self, unit_id):
+        """Index of the last unit with ``unit_id``, or -1."""
+        if unit_id is None:
+            return -1
+        if self._id_keys is None:
+            self._index_ids()
+        if self._id_positions is not None:
+            return self.index_of(unit_id)
+        for position in range(len(self._runs) - 1, -1, -1):
+            run = self._runs[position]
+            offset = unit_id - run[0]
+            if 0 <= offset < len(run[1]):
+                return self._starts[position] + offset
+        return -1
+
+    def max_id(self):
+        return max((run[0] + len(run[1]) - 1 for run in self._runs), default=0)
+
+    def pieces(self, start=0, stop=None):
+        """
+        Yield ``(first_id, value, attributes, origin)`` for the runs
+        overlapping units ``start`` to ``stop``, clipped to that range.
+        """
+        stop = self._length if stop is None else min(stop, self._length)
+        if start >= stop:
+            return
+        position = bisect_right(self._starts, start) - 1
+        while position < len(self._runs):
+            run_start = self._starts[position]
+            if run_start >= stop:
+                return
+            first_id, value, attributes, origin = self._runs[position]
+            lo = max(start, run_start) - run_start
+            hi = min(stop, run_start + len(value)) - run_start
+            yield first_id + lo, value[lo:hi], attributes, origin
+            position += 1
+
+    def newline_indices(self, newline='\n', start=0, stop=None):
+        """Indices of the units whose value is ``newline``."""
+        stop = self._length if stop is None else stop
+        if len(newline) != 1:
+            return []
+        indices = []
+        position = max(bisect_right(self._starts, start) - 1, 0)
+        while position < len(self._runs) and self._starts[position] < stop:
+            value = self._runs[position][1]
+            run_start = self._starts[position]
+            if isinstance(value, str):
+                found = value.find(newline, max(start - run_start, 0))
+                while found >= 0 and run_start + found < stop:
+                    indices.append(run_start + found)
+                    found = value.find(newline, found + 1)
+            position += 1
+        return indices
+
+    def document_segments(self):
+        """
+        Yield ``(value, attributes)`` for each insert of the document this
+        state describes: adjacent text with equal attributes joined (and
+        surrogate pairs recombined), embeds one by one. Values are shared.
+        """
+        text = []
+        text_attributes = None
+        for _first_id, value, attributes, _origin in self._runs:
+            if isinstance(value, str) and text and (attributes is text_attributes or attributes == text_attributes):
+                text.append(value)
+                continue
+            if text:
+                yield _decode_code_units(''.join(text)), text_attributes
+                text = []
+            if isinstance(value, str):
+                text.append(value)
+                text_attributes = attributes
+            else:
+                yield value[0], attributes
+        if text:
+            yield _decode_code_units(''.join(text)), text_attributes
+
+    def same_document(self, other):
+        """Whether both states describe the same document, ignoring ids."""
+        if self._runs is other._runs:
+            return True
+        missing = object()
+        return all(left == right for left, right in
+                   zip_longest(self.document_segments(), other.document_segments(), fillvalue=missing))
+
+    def same_units(self, other, skip_inserted=False):
+        """
+        Whether both states hold the same unit ids, values and attributes in
+        the same order, ignoring origin gaps. With ``skip_inserted``, units
+        that carry an origin gap are left out of the comparison.
+        """
+        left_runs, right_runs = self._runs, other._runs
+        if skip_inserted:
+            left_runs = [run for run in left_runs if not run[3]]
+            right_runs = [run for run in right_runs if not run[3]]
+        elif self._length != other._length:
+            return False
+        if left_runs is right_runs or left_runs == right_runs:
+            return True
+        left_iter, right_iter = iter(left_runs), iter(right_runs)
+        left = right = None
+        left_offset = right_offset = 0
+        while True:
+            if left is None or left_offset == len(left[1]):
+                left, left_offset = next(left_iter, None), 0
+            if right is None or right_offset == len(right[1]):
+                right, right_offset = next(right_iter, None), 0
+            if left is None or right is None:
+                return left is right
+            count = min(len(left[1]) - left_offset, len(right[1]) - right_offset)
+            if (left[0] + left_offset != right[0] + right_offset
+                    or left[1][left_offset:left_offset + count] != right[1][right_offset:right_offset + count]
+                    or (left[2] is not right[2] and left[2] != right[2])):
+                return False
+            left_offset += count
+            right_offset += count
+
+    def insert_units(self, index, units):
+        """A new state with unit dicts ``units`` inserted before unit ``index``."""
+        builder = _StateBuilder()
+        builder.extend(self, 0, index)
+        for unit in units:
+            builder.add_unit(unit)
+        builder.extend(self, index, None)
+        return builder.build()
+
+    def remap_ids(self, mapping):
+        """A new state with unit ids translated through ``mapping``."""
+        keys = sorted(mapping)
+        builder = _StateBuilder()
+        for first_id, value, attributes, origin in self._runs:
+            found = bisect_left(keys, first_id)
+            if found == len(keys) or keys[found] >= first_id + len(value):
+                builder.append(first_id, value, attributes, origin)
+                continue
+            for offset in range(len(value)):
+                unit_id = first_id + offset
+                builder.append(mapping.get(unit_id, unit_id), value[offset:offset + 1], attributes, origin)
+        return builder.build()
+
+
+class _StateBuilder:
+    """Accumulates units into a ``LabeledState``, merging compatible runs."""
+
+    def __init__(self):
+        self.runs = []
+        self._text = []
+        self._next_id = None
+
+    def _flush(self):
+        if self._text:
+            first_id, _value, attributes, origin = self.runs[-1]
+            self.runs[-1] = (first_id, ''.join(self._text), attributes, origin)
+            self._text = []
+
+    def append(self, first_id, value, attributes, origin):
+        if value:
+            self.append_run((first_id, value, attributes, origin))
+
+    def append_run(self, run):
+        first_id, value, attributes, origin = run
+        if self.runs and first_id == self._next_id and isinstance(value, str):
+            _first, last, last_attributes, last_origin = self.runs[-1]
+            if (isinstance(last, str)
+                    and (last_attributes is attributes or last_attributes == attributes)
+                    and (last_origin is origin or last_origin == origin)):
+                if not self._text:
+                    self._text.append(last)
+                self._text.append(value)
+                self._next_id = first_id + len(value)
+                return
+        self._flush()
+        self.runs.append(run)
+        self._next_id = first_id + len(value)
+
+    def add_unit(self, unit):
+        value = unit['value']
+        self.append(unit['id'], value if isinstance(value, str) else (_clone_value(value),),
+                    _clone_attributes(unit.get('attributes')), get_unit_origin_gap(unit))
+
+    def extend(self, state, start, stop):
+        """
+        Append units ``start`` to ``stop`` of ``state``. Runs strictly inside
+        the range are shared, not rebuilt.
+        """
+        stop = len(state) if stop is None else min(stop, len(state))
+        if start >= stop:
+            return
+        runs = state._runs
+        first = bisect_right(state._starts, start) - 1
+        last = bisect_right(state._starts, stop - 1) - 1
+        if first == last:
+            for piece in state.pieces(start, stop):
+                self.append(*piece)
+            return
+        offset = start - state._starts[first]
+        first_id, value, attributes, origin = runs[first]
+        self.append(first_id + offset, value[offset:], attributes, origin)
+        if last > first + 1:
+            self.append_run(runs[first + 1])
+            if last > first + 2:
+                self._flush()
+                self.runs.extend(runs[first + 2:last])
+                first_id, value, _attributes, _origin = runs[last - 1]
+                self._next_id = first_id + len(value)
+        first_id, value, attributes, origin = runs[last]
+        self.append(first_id, value[:stop - state._starts[last]], attributes, origin)
+
+    def build(self):
+        self._flush()
+        return LabeledState(self.runs)
 
 
 def labeled_state_from_document(document, newline='\n'):
-    canonical = canonicalize_document(document, newline)
-    units = [
-        {'id': i + 1, 'value': _clone_value(u['value']), 'attributes': _clone_attributes(u['attributes'])}
-        for i, u in enumerate(flatten_document_units(canonical))
-    ]
-    return {'units': units, 'gaps': _build_gap_anchors(units)}
+    return LabeledState.from_document(document, newline)
+
+
+def as_labeled_state(state):
+    """Return ``state`` as a ``LabeledState``, converting a plain dict state."""
+    if isinstance(state, LabeledState):
+        return state
+    return LabeledState.from_units(state['units'])
 
 
 def clone_labeled_unit(unit):
@@ -148,49 +579,25 @@ def clone_labeled_unit(unit):
 
 
 def clone_labeled_state(state):
-    return {
-        'units': [clone_labeled_unit(u) for u in state['units']],
-        'gaps': [{'gapId': g['gapId'], 'afterUnitId': g['afterUnitId'], 'beforeUnitId': g['beforeUnitId']}
-                 for g in state['gaps']],
-    }
-
-
-def _is_high_surrogate(ch):
-    return isinstance(ch, str) and len(ch) == 1 and 0xD800 <= ord(ch) <= 0xDBFF
-
-
-def _is_low_surrogate(ch):
-    return isinstance(ch, str) and len(ch) == 1 and 0xDC00 <= ord(ch) <= 0xDFFF
+    """States are immutable, so a clone shares the original."""
+    return as_labeled_state(state)
 
 
-def _combine_surrogates(high, low):
-    code = 0x10000 + ((ord(high) - 0xD800) << 10) + (ord(low) - 0xDC00)
-    return chr(code)
+def _decode_code_units(text):
+    """Recombine UTF-16 surrogate pairs held as separate characters."""
+    return text.encode('utf-16-le', 'surrogatepass').decode('utf-16-le', 'surrogatepass')
 
 
 def labeled_state_to_delta(state):
     from .base import Delta
     d = Delta()
-    units = state['units']
-    i = 0
-    while i < len(units):
-        unit = units[i]
-        value = unit['value']
-        attrs = _clone_attributes(unit.get('attributes'))
-        # Recombine UTF-16 surrogate pairs back into proper Unicode
-        if (_is_high_surrogate(value) and i + 1 < len(units)
-                and _is_low_surrogate(units[i + 1]['value'])
-                and units[i + 1].get('attributes', {}) == attrs):
-            value = _combine_surrogates(value, units[i + 1]['value'])
-            i += 2
-        else:
-            i += 1
-        d.insert(_clone_value(value), **attrs)
+    for value, attributes in as_labeled_state(state).document_segments():
+        d.insert(value if isinstance(value, str) else _clone_value(value), **_clone_attributes(attributes))
     return d
 
 
 def max_unit_id(state):
-    return max((u['id'] for u in state['units']), default=0)
+    return as_labeled_state(state).max_id()
 
 
 def _flatten_inserted_content(value, attributes=None):
@@ -200,29 +607,25 @@ def _flatten_inserted_content(value, attributes=None):
 
 
 def find_gap_index(state, gap):
-    units = state['units']
+    state = as_labeled_state(state)
     if gap['afterUnitId'] is None:
         if gap['beforeUnitId'] is None:
             return 0
-        for i, u in enumerate(units):
-            if u['id'] == gap['beforeUnitId']:
-                return i
-        return 0
-    for i, u in enumerate(units):
-        if u['id'] == gap['afterUnitId']:
-            return i + 1
+        index = state.index_of(gap['beforeUnitId'])
+        return index if index >= 0 else 0
+    index = state.index_of(gap['afterUnitId'])
+    if index >= 0:
+        return index + 1
     if gap['beforeUnitId'] is None:
-        return len(units)
-    for i, u in enumerate(units):
-        if u['id'] == gap['beforeUnitId']:
-            return i
-    return len(units)
+        return len(state)
+    index = state.index_of(gap['beforeUnitId'])
+    return index if index >= 0 else len(state)
 
 
 def _unit_was_inserted_at_gap(state, index, gap):
-    if index < 0 or index >= len(state['units']):
+    if index < 0 or index >= len(state):
         return False
-    origin = get_unit_origin_gap(state['units'][index])
+    origin = state.origin(index)
     return origin is not None and same_gap_anchor(origin, gap)
 
 
@@ -235,23 +638,14 @@ def _descendant_run_start(state, before_index, gap):
 
 def _after_whole_line_prefix_index(state, before_index, gap, newline='\n'):
     start = _descendant_run_start(state, before_index, gap)
-    insertion_index = start
-    for index in range(start, before_index):
-        unit = state['units'][index]
-        if isinstance(unit['value'], str) and unit['value'] == newline:
-            insertion_index = index + 1
-    return insertion_index
+    newlines = state.newline_indices(newline, start, before_index)
+    return newlines[-1] + 1 if newlines else start
 
 
 def _find_gap_edge_index(state, gap, edge, newline='\n'):
-    units = state['units']
-    after_index = -1
-    before_index = -1
-    for i, u in enumerate(units):
-        if u['id'] == gap.get('afterUnitId'):
-            after_index = i
-        if u['id'] == gap.get('beforeUnitId'):
-            before_index = i
+    state = as_labeled_state(state)
+    after_index = state.last_index_of(gap.get('afterUnitId'))
+    before_index = state.last_index_of(gap.get('beforeUnitId'))
 
     if edge == 'before':
         if after_index >= 0:
@@ -268,21 +662,20 @@ def _find_gap_edge_index(state, gap, edge, newline='\n'):
         return _after_whole_line_prefix_index(state, before_index, gap, newline)
     if after_index >= 0:
         index = after_index + 1
-        while index < len(units) and _unit_was_inserted_at_gap(state, index, gap):
+        while index < len(state) and _unit_was_inserted_at_gap(state, index, gap):
             index += 1
         return index
     return find_gap_index(state, gap)
 
 
 def classify_gap_descendants(state, gap, newline='\n'):
+    state = as_labeled_state(state)
     before_index = _find_gap_edge_index(state, gap, 'before', newline)
     after_index = _find_gap_edge_index(state, gap, 'after', newline)
-    descendants = state['units'][before_index:after_index]
-    whole_line_prefix_units = 0
-    for i, unit in enumerate(descendants):
-        if isinstance(unit['value'], str) and unit['value'] == newline:
-            whole_line_prefix_units = i + 1
-    trailing_partial_units = len(descendants) - whole_line_prefix_units
+    descendant_count = max(after_index - before_index, 0)
+    newlines = state.newline_indices(newline, before_index, after_index)
+    whole_line_prefix_units = newlines[-1] + 1 - before_index if newlines else 0
+    trailing_partial_units = descendant_count - whole_line_prefix_units
     return {
         'wholeLinePrefixUnits': whole_line_prefix_units,
         'trailingPartialUnits': trailing_partial_units,
@@ -291,34 +684,34 @@ def classify_gap_descendants(state, gap, newline='\n'):
 
 
 def rebuild_labeled_state(units):
-    cloned = [clone_labeled_unit(u) for u in units]
-    return {'units': cloned, 'gaps': _build_gap_anchors(cloned)}
+    return LabeledState.from_units(units)
 
 
 def resolve_delta_against_state(base, delta):
+    base = as_labeled_state(base)
     inserts_by_gap = []
     deleted_unit_ids = []
     format_patches_by_unit_id = []
     cursor = 0
-    next_inserted_id = max_unit_id(base) + 1
+    next_inserted_id = base.max_id() + 1
 
     for o in delta.ops:
         if o.get('insert') is not None:
+            gap = base.gap(cursor)
             units = []
             for seed in _flatten_inserted_content(o['insert'], o.get('attributes')):
                 unit = {'id': next_inserted_id, 'value': seed['value'], 'attributes': seed['attributes']}
-                _attach_origin_gap(unit, base['gaps'][cursor])
+                _attach_origin_gap(unit, gap)
                 units.append(unit)
                 next_inserted_id += 1
             inserts_by_gap.append({
-                'gap': copy.deepcopy(base['gaps'][cursor]),
+                'gap': gap,
                 'units': units,
             })
             continue
         if isinstance(o.get('delete'), int):
             end = cursor + o['delete']
-            for unit in base['units'][cursor:end]:
-                deleted_unit_ids.append(unit['id'])
+            deleted_unit_ids.extend(base.unit_ids(cursor, end))
             cursor = end
             continue
         if isinstance(o.get('retain'), dict):
@@ -326,9 +719,9 @@ def resolve_delta_against_state(base, delta):
         if isinstance(o.get('retain'), int):
             end = cursor + o['retain']
             if o.get('attributes'):
-                for unit in base['units'][cursor:end]:
+                for unit_id in base.unit_ids(cursor, end):
                     format_patches_by_unit_id.append({
-                        'unitId': unit['id'],
+                        'unitId': unit_id,
                         'attributes': _clone_attributes(o.get('attributes')),
                     })
             cursor = end
@@ -347,36 +740,100 @@ def resolve_delta(document, delta, newline='\n'):
     return resolve_delta_against_state(labeled_state_from_document(document, newline), delta)
 
 
+def _inserted_at_gap(unit, gap):
+    origin = unit.get(_ORIGIN_GAP)
+    return origin is not None and same_gap_anchor(origin, gap)
+
+
+def _slot_insert_position(state, slots, gap, newline='\n'):
+    """
+    Where ``_find_gap_edge_index(..., 'after')`` would place an insert at
+    ``gap``, given ``state`` with the ``slots`` inserts applied. Slot ``i``
+    holds the units inserted before unit ``i`` of ``state``. Returns a
+    ``(slot, offset)`` pair, or None when the answer depends on units of
+    ``state`` itself.
+    """
+    before_index = state.last_index_of(gap.get('beforeUnitId'))
+    if before_index >= 0:
+        units = slots.get(before_index, ())
+        start = len(units)
+        while start > 0 and _inserted_at_gap(units[start - 1], gap):
+            start -= 1
+        if start == 0 and _unit_was_inserted_at_gap(state, before_index - 1, gap):
+            return None
+        offset = start
+        for index in range(start, len(units)):
+            if units[index]['value'] == newline:
+                offset = index + 1
+        return before_index, offset
+    after_index = state.last_index_of(gap.get('afterUnitId'))
+    if after_index >= 0:
+        slot = after_index + 1
+        units = slots.get(slot, ())
+        offset = 0
+        while offset < len(units) and _inserted_at_gap(units[offset], gap):
+            offset += 1
+        if offset == len(units) and _unit_was_inserted_at_gap(state, slot, gap):
+            return None
+        return slot, offset
+    if gap['afterUnitId'] is None:
+        return 0, 0
+    return len(state), len(slots.get(len(state), ()))
+
+
+def _merge_slots(state, slots):
+    """``state`` with the units of each slot inserted before its index."""
+    if not slots:
+        return state
+    builder = _StateBuilder()
+    cursor = 0
+    for slot in sorted(slots):
+        builder.extend(state, cursor, slot)
+        for unit in slots[slot]:
+            builder.add_unit(unit)
+        cursor = slot
+    builder.extend(state, cursor, None)
+    return builder.build()
+
+
 def replay_resolved_delta(state, resolved):
+    state = as_labeled_state(state)
     deleted = set(resolved['deletedUnitIds'])
     format_map = {}
     for patch in resolved['formatPatchesByUnitId']:
         format_map[patch['unitId']] = _clone_attributes(patch['attributes'])
 
-    units = []
-    for unit in state['units']:
-        if unit['id'] in deleted:
-            continue
-        patch = format_map.get(unit['id'])
-        if patch is None:
-            units.append(clone_labeled_unit(unit))
-        else:
-            composed = op_module.compose(unit.get('attributes'), patch, False) or {}
-            cloned = {
-                'id': unit['id'],
-                'value': _clone_value(unit['value']),
-                'attributes': composed,
-            }
-            _attach_origin_gap(cloned, get_unit_origin_gap(unit))
-            units.append(cloned)
-
-    working = {'units': units, 'gaps': _build_gap_anchors(units)}
-
-    for insert in resolved['insertsByGap']:
-        gap_index = _find_gap_edge_index(working, insert['gap'], 'after')
-        cloned_units = [clone_labeled_unit(u) for u in insert['units']]
-        for i, u in enumerate(cloned_units):
-            working['units'].insert(gap_index + i, u)
-        working['gaps'] = _build_gap_anchors(working['units'])
-
-    return working
+    touched = sorted(deleted.union(format_map))
+    builder = _StateBuilder()
+    for first_id, value, attributes, origin in state.pieces():
+        end_id = first_id + len(value)
+        lo = bisect_left(touched, first_id)
+        hi = bisect_left(touched, end_id, lo)
+        cursor = first_id
+        for unit_id in touched[lo:hi]:
+            builder.append(cursor, value[cursor - first_id:unit_id - first_id], attributes, origin)
+            cursor = unit_id + 1
+            if unit_id in deleted:
+                continue
+            patched = op_module.compose(attributes, format_map[unit_id], False) or {}
+            builder.append(unit_id, value[unit_id - first_id:cursor - first_id], patched, origin)
+        builder.append(cursor, value[cursor - first_id:], attributes, origin)
+    working = builder.build()
+
+    inserts = resolved['insertsByGap']
+    inserted_ids = {unit['id'] for insert in inserts for unit in insert['units']}
+    slotted = not any(insert['gap'].get('afterUnitId') in inserted_ids
+                      or insert['gap'].get('beforeUnitId') in inserted_ids for insert in inserts)
+    slots = {}
+    for position, insert in enumerate(inserts):
+        found = _slot_insert_position(working, slots, insert['gap']) if slotted else None
+        if found is None:
+            working = _merge_slots(working, slots)
+            for insert in inserts[position:]:
+                gap_index = _find_gap_edge_index(working, insert['gap'], 'after')
+                working = working.insert_units(gap_index, insert['units'])
+            return working
+        slot, offset = found
+        slots.setdefault(slot, [])[offset:offset] = insert['units']
+
+    return _merge_slots(working, slots)
@@ -1,63 +1,237 @@
+import bisect
 import copy
+import functools
 import math
+import re
+import weakref
+from collections import OrderedDict
+from collections.abc import Mapping
 
 
 # ── UTF-16 length utilities ──
 # Delta uses UTF-16 code unit lengths to match JavaScript string semantics.
 # Characters above U+FFFF (e.g. emoji) count as 2 code units.
 
+def _string_cache(max_chars):
+    """
+    Memoize a function of one string, keeping the most recently used entries
+    whose strings add up to at most ``max_chars`` characters. Longer strings
+    are computed without being cached, so the cache never keeps more than
+    ``max_chars`` of document text alive.
+    """
+    def decorate(fn):
+        entries = OrderedDict()
+        size = 0
+
+        @functools.wraps(fn)
+        def cached(s):
+            nonlocal size
+            try:
+                entries.move_to_end(s)
+                return entries[s]
+            except KeyError:
+                pass
+            value = fn(s)
+            if len(s) <= max_chars:
+                entries[s] = value
+                size += len(s)
+                while size > max_chars:
+                    evicted, _ = entries.popitem(last=False)
+                    size -= len(evicted)
+            return value
+
+        def cache_clear():
+            nonlocal size
+            entries.clear()
+            size = 0
+
+        cached.cache_clear = cache_clear
+        cached.cache_size = lambda: size
+        return cached
+    return decorate
+
+
+@_string_cache(max_chars=1 << 20)
+def _utf16_profile(s):
+    # Keyed by the string itself: insert text is immutable, so a merged insert
+    # in ``Delta.push`` is a new key and can never see a stale entry.
+    units = len(s.encode('utf-16-le', 'surrogatepass')) // 2
+    return units, units == len(s)
+
+
 def utf16_len(s):
     """Return the UTF-16 code unit length of a Python string."""
-    return sum(2 if ord(c) > 0xFFFF else 1 for c in s)
+    if s.isascii():
+        return len(s)
+    return _utf16_profile(s)[0]
+
+
+def is_bmp(s):
+    """Return True if every character of ``s`` is a single UTF-16 code unit."""
+    return s.isascii() or _utf16_profile(s)[1]
 
 
 def utf16_slice(s, offset, length):
     """Slice a Python string by UTF-16 code unit offset and length."""
-    # Convert UTF-16 offset to Python char index
-    py_start = 0
-    remaining = offset
-    while remaining > 0 and py_start < len(s):
-        units = 2 if ord(s[py_start]) > 0xFFFF else 1
-        remaining -= units
-        py_start += 1
-    # Convert UTF-16 length to Python char count from that position
-    py_end = py_start
-    remaining = length
-    while remaining > 0 and py_end < len(s):
-        units = 2 if ord(s[py_end]) > 0xFFFF else 1
-        remaining -= units
-        py_end += 1
+    if is_bmp(s):
+        start = max(offset, 0)
+        return s[start:start + max(length, 0)]
+    starts = _astral_starts(s)
+    py_start, unit_start = _utf16_to_index(s, starts, offset)
+    if length <= 0:
+        return ''
+    py_end, _ = _utf16_to_index(s, starts, unit_start + length)
     return s[py_start:py_end]
 
 
+_ASTRAL = re.compile('[\U00010000-\U0010FFFF]')
+
+
+@_string_cache(max_chars=1 << 20)
+def _astral_starts(s):
+    """UTF-16 offsets at which the astral characters of ``s`` start."""
+    return [m.start() + i for i, m in enumerate(_ASTRAL.finditer(s))]
+
+
+def _utf16_to_index(s, starts, offset):
+    """
+    Map a UTF-16 offset to the first Python index at or after it.
+
+    Returns ``(index, unit_offset)``; an offset that falls inside a surrogate
+    pair rounds up past the pair, matching a code point walk.
+    """
+    if offset <= 0:
+        return 0, 0
+    astral_before = bisect.bisect_left(starts, offset)
+    index = offset - astral_before
+    if astral_before and starts[astral_before - 1] == offset - 1:
+        index += 1
+        offset += 1
+    if index >= len(s):
+        return len(s), len(s) + len(starts)
+    return index, offset
+
+
 # ── Attribute operations ──
 
+def clone(value):
+    """
+    Deep-copy a JSON-like value.
+
+    Strings, numbers and None are shared rather than copied, which makes this
+    much cheaper than ``copy.deepcopy`` for op and attribute payloads.
+    """
+    if value is None or isinstance(value, (str, int, float, AttributeMap)):
+        return value
+    if isinstance(value, Op):
+        return Op(value.kind, clone(value.payload), clone(value.attributes))
+    if isinstance(value, dict):
+        return {k: clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [clone(v) for v in value]
+    return copy.deepcopy(value)
+
+
+# ── Interned attribute maps ──
+# Documents reuse a handful of attribute sets many times. Interned maps are
+# frozen and canonical, so equal maps are the same object, and the attribute
+# operations below memoize their results for pairs of interned maps. The
+# Delta builders and the attribute operations intern every map they produce.
+
+class AttributeMap(dict):
+    """A frozen, interned attribute dict. Build one with ``intern_attributes``."""
+
+    __slots__ = ('_hash', '__weakref__')
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('interned attribute maps are immutable')
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = __ior__ = _immutable
+
+    def __hash__(self):
+        return self._hash
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return intern_attributes, (dict(self),)
+
+
+_interned_maps = weakref.WeakValueDictionary()
+
+
+def intern_attributes(attributes):
+    """
+    Return the canonical frozen ``AttributeMap`` equal to ``attributes``.
+
+    Only maps whose values are strings, numbers, booleans or None can be
+    interned; anything else is returned unchanged, as is None.
+    """
+    if attributes is None or attributes.__class__ is AttributeMap:
+        return attributes
+    key = []
+    for k, v in attributes.items():
+        if v is not None and not isinstance(v, (str, int, float)):
+            return attributes
+        key.append((k, v.__class__, v))
+    key = frozenset(key)
+    interned = _interned_maps.get(key)
+    if interned is None:
+        interned = AttributeMap(attributes)
+        interned._hash = hash(key)
+        _interned_maps[key] = interned
+    return interned
+
+
+def _is_interned(attributes):
+    return attributes is None or attributes.__class__ is AttributeMap
+
+
+@functools.lru_cache(maxsize=4096)
+def _memoized(fn, a, b, *args):
+    return intern_attributes(fn(
+        dict(a) if a is not None else None,
+        dict(b) if b is not None else None,
+        *args))
+
+
 def compose(a, b, keep_null=False):
     """
     Compose two attribute sets into one.
 
     ``keep_null`` controls whether None values are retained in the result.
     """
+    if _is_interned(a) and _is_interned(b) and (a or b):
+        return _memoized(compose, a, b, keep_null)
     if a is None:
         a = {}
     if b is None:
         b = {}
 
     attributes = {
-        k: copy.deepcopy(v)
+        k: clone(v)
         for k, v in b.items()
         if keep_null or v is not None
     }
 
     for k, v in a.items():
         if k not in b:
-            attributes[k] = copy.deepcopy(v)
+            attributes[k] = clone(v)
 
-    return attributes or None
+    return intern_attributes(attributes or None)
 
 
 def diff(a, b):
     """Return the attribute difference from a to b."""
+    if a is b:
+        return None
+    if _is_interned(a) and _is_interned(b):
+        return _memoized(diff, a, b)
     if a is None:
         a = {}
     if b is None:
@@ -68,10 +242,12 @@ def diff(a, b):
         if a.get(k) != b.get(k):
             attributes[k] = b.get(k)
 
-    return attributes or None
+    return intern_attributes(attributes or None)
 
 
 def invert(attr, base):
+    if _is_interned(attr) and _is_interned(base) and (attr or base):
+        return _memoized(invert, attr, base)
     attr = attr or {}
     base = base or {}
 
@@ -85,7 +261,7 @@ def invert(attr, base):
         if attr[k] != base.get(k) and k not in base:
             result[k] = None
 
-    return result
+    return intern_attributes(result)
 
 
 def transform(a, b, priority=True):
@@ -94,21 +270,122 @@ def transform(a, b, priority=True):
 
     If ``priority`` is false, just return b unchanged.
     """
+    if _is_interned(a) and _is_interned(b) and (a or b):
+        return _memoized(transform, a, b, priority)
     if a is None:
         a = {}
     if b is None:
         b = {}
 
     if not priority:
-        return b or None
+        return intern_attributes(b or None)
 
     attributes = {k: v for k, v in b.items() if k not in a}
-    return attributes or None
+    return intern_attributes(attributes or None)
 
 
 # ── Op helpers ──
 
+_OP_KINDS = ('insert', 'delete', 'retain')
+
+
+class Op(Mapping):
+    """
+    Compact op representation, an opt-in alternative to plain dict ops.
+
+    Stores a kind tag, the payload, the attributes and a cached UTF-16
+    length in slots. It reads like the dict form (``get``, ``[]``, ``in``,
+    ``==``), so it can be mixed with dict ops anywhere a Delta is accepted;
+    ``from_dict`` and ``to_dict`` convert losslessly at the API edge.
+    """
+
+    __slots__ = ('kind', 'payload', 'attributes', 'length')
+
+    def __init__(self, kind, payload, attributes=None):
+        self.kind = kind
+        self.payload = payload
+        self.attributes = attributes
+        self.length = _payload_length(kind, payload)
+
+    @classmethod
+    def from_dict(cls, o):
+        if isinstance(o, Op):
+            return cls(o.kind, o.payload, o.attributes)
+        keys = [k for k in o if k != 'attributes']
+        if len(keys) != 1 or keys[0] not in _OP_KINDS or type_of(o) != keys[0]:
+            raise ValueError(f'cannot represent op compactly: {o!r}')
+        return cls(keys[0], o[keys[0]], intern_attributes(o.get('attributes')))
+
+    def to_dict(self):
+        o = {self.kind: self.payload}
+        if self.attributes is not None:
+            o['attributes'] = dict(self.attributes)
+        return o
+
+    def __getitem__(self, key):
+        if key == self.kind:
+            return self.payload
+        if key == 'attributes' and self.attributes is not None:
+            return self.attributes
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        # Delta.push merges adjacent ops in place.
+        if key == self.kind:
+            self.payload = value
+            self.length = _payload_length(self.kind, value)
+        elif key == 'attributes':
+            self.attributes = value
+        else:
+            raise KeyError(f'cannot set {key!r} on a {self.kind} op')
+
+    def get(self, key, default=None):
+        if key == self.kind:
+            return self.payload
+        if key == 'attributes' and self.attributes is not None:
+            return self.attributes
+        return default
+
+    def __contains__(self, key):
+        return key == self.kind or (key == 'attributes' and self.attributes is not None)
+
+    def __iter__(self):
+        yield self.kind
+        if self.attributes is not None:
+            yield 'attributes'
+
+    def __len__(self):
+        return 1 if self.attributes is None else 2
+
+    def __eq__(self, other):
+        if isinstance(other, Op):
+            return (self.kind == other.kind
+                    and self.payload == other.payload
+                    and self.attributes == other.attributes)
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return Op, (self.kind, self.payload, self.attributes)
+
+    def __repr__(self):
+        return f'Op({self.to_dict()!r})'
+
+
+def _payload_length(kind, payload):
+    if kind == 'insert':
+        return utf16_len(payload) if isinstance(payload, str) else 1
+    if kind == 'retain' and isinstance(payload, dict):
+        return 1
+    return payload
+
+
 def length_of(op):
+    if op.__class__ is Op:
+        return op.length
     if isinstance(op.get('delete'), int):
         return op['delete']
     if isinstance(op.get('retain'), (int, float)):
@@ -123,6 +400,8 @@ def length_of(op):
 def type_of(op):
     if not op:
         return None
+    if op.__class__ is Op:
+        return op.kind
     if isinstance(op.get('delete'), int):
         return 'delete'
     if isinstance(op.get('retain'), int) or (isinstance(op.get('retain'), dict) and op.get('retain')):
@@ -167,6 +446,17 @@ class Iterator:
         else:
             self.offset += length
 
+        if op.__class__ is Op:
+            if op_type == 'insert' and isinstance(op.payload, str):
+                payload = utf16_slice(op.payload, offset, length)
+            elif op_type == 'retain' and isinstance(op.payload, dict):
+                payload = op.payload
+            elif op_type == 'insert':
+                payload = op.payload
+            else:
+                payload = length
+            return Op(op_type, payload, None if op_type == 'delete' else op.attributes or None)
+
         if op_type == 'delete':
             return {'delete': length}
 
@@ -1,42 +1,36 @@
 """
 Block span projection from documents and labeled states.
 """
-from .labeled_state import labeled_state_from_document
+from .labeled_state import as_labeled_state
 
 
-def _is_newline_unit(value, newline):
-    return isinstance(value, str) and value == newline
-
-
-def project_labeled_block_spans(state, newline='\n'):
-    spans = []
+def project_labeled_block_ranges(state, newline='\n'):
+    """``(from, to)`` unit ranges of the blocks of ``state``, without gap anchors."""
+    state = as_labeled_state(state)
+    ranges = []
     from_idx = 0
-    for i, unit in enumerate(state['units']):
-        if not _is_newline_unit(unit['value'], newline):
-            continue
-        spans.append({
-            'from': from_idx,
-            'to': i + 1,
-            'leftGap': state['gaps'][from_idx],
-            'rightGap': state['gaps'][i + 1],
-        })
+    for i in state.newline_indices(newline):
+        ranges.append((from_idx, i + 1))
         from_idx = i + 1
-    if from_idx != len(state['units']):
+    if from_idx != len(state):
         raise ValueError('labeled state must end with a final newline boundary')
-    return spans
+    return ranges
+
+
+def project_labeled_block_spans(state, newline='\n'):
+    state = as_labeled_state(state)
+    return [
+        {'from': from_idx, 'to': to_idx, 'leftGap': state.gap(from_idx), 'rightGap': state.gap(to_idx)}
+        for from_idx, to_idx in project_labeled_block_ranges(state, newline)
+    ]
 
 
 def project_block_spans(document, newline='\n'):
-    spans = project_labeled_block_spans(
-        labeled_state_from_document(document, newline), newline)
-    return [{'from': s['from'], 'to': s['to']} for s in spans]
+    return document.block_index(newline).spans()
 
 
 def block_boundaries(document, newline='\n'):
-    spans = project_block_spans(document, newline)
-    if not spans:
-        return [0]
-    return [spans[0]['from']] + [s['to'] for s in spans]
+    return document.block_index(newline).boundaries()
 
 
 def block_boundary_gap_anchors(state, newline='\n'):
@@ -0,0 +1,174 @@
+"""
+Persistent rope over document insert runs, indexed by UTF-16 length.
+
+A ``Rope`` holds a document (a Delta with only insert ops) in a randomized
+balanced tree so that composing a small change costs O(log n + change size)
+instead of rebuilding the whole op list. Ropes are immutable: ``compose``
+returns a new rope that shares every untouched subtree with the original.
+"""
+import random
+
+from . import op
+from .base import Delta, get_embed_type_and_data
+
+
+class _Node:
+    __slots__ = ('op', 'length', 'total', 'priority', 'left', 'right')
+
+    def __init__(self, operation, length, priority, left=None, right=None):
+        self.op = operation
+        self.length = length
+        self.priority = priority
+        self.left = left
+        self.right = right
+        self.total = length + _total(left) + _total(right)
+
+
+def _total(node):
+    return node.total if node is not None else 0
+
+
+def _leaf(operation):
+    return _Node(operation, op.length_of(operation), random.random())
+
+
+def _with_children(node, left, right):
+    return _Node(node.op, node.length, node.priority, left, right)
+
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        return _with_children(left, left.left, _merge(left.right, right))
+    return _with_children(right, _merge(left, right.left), right.right)
+
+
+def _split(node, index):
+    """Split ``node`` into the first ``index`` code units and the rest."""
+    if node is None:
+        return None, None
+    left_total = _total(node.left)
+    if index <= left_total:
+        left, right = _split(node.left, index)
+        return left, _with_children(node, right, node.right)
+    if index >= left_total + node.length:
+        left, right = _split(node.right, index - left_total - node.length)
+        return _with_children(node, node.left, left), right
+    it = op.Iterator([node.op])
+    head = it.next(index - left_total)
+    tail = it.next()
+    return _merge(node.left, _leaf(head)), _merge(_leaf(tail), node.right)
+
+
+def _build(ops, lo, hi):
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    left = _build(ops, lo, mid)
+    right = _build(ops, mid + 1, hi)
+    priority = max(
+        left.priority if left is not None else 0,
+        right.priority if right is not None else 0) + random.random()
+    return _Node(ops[mid], op.length_of(ops[mid]), priority, left, right)
+
+
+def _walk(node):
+    stack = []
+    while stack or node is not None:
+        if node is not None:
+            stack.append(node)
+            node = node.left
+        else:
+            node = stack.pop()
+            yield node.op
+            node = node.right
+
+
+def _format_run(node, operator):
+    """Apply a retain ``operator`` to every insert in ``node``, as compose does."""
+    ops = []
+    for base_op in _walk(node):
+        new_op = {}
+        if isinstance(operator['retain'], dict):
+            embed_type, base_data, other_data = get_embed_type_and_data(
+                base_op.get('insert'), operator['retain'])
+            handler = Delta.get_handler(embed_type)
+            new_op['insert'] = {embed_type: handler.compose(base_data, other_data, False)}
+        else:
+            new_op['insert'] = base_op['insert']
+        attributes = op.compose(base_op.get('attributes'), operator.get('attributes'), False)
+        if attributes:
+            new_op['attributes'] = attributes
+        ops.append(new_op)
+    return _build(ops, 0, len(ops))
+
+
+class Rope:
+    """A persistent document representation with logarithmic compose."""
+
+    def __init__(self, ops=None):
+        if hasattr(ops, 'ops'):
+            ops = ops.ops
+        ops = ops or []
+        for o in ops:
+            if op.type_of(o) != 'insert':
+                raise ValueError('rope can only hold document deltas (insert ops only)')
+        self._root = _build([op.clone(o) for o in ops], 0, len(ops))
+
+    @classmethod
+    def _from_root(cls, root):
+        rope = cls.__new__(cls)
+        rope._root = root
+        return rope
+
+    def __len__(self):
+        return _total(self._root)
+
+    def __eq__(self, other):
+        if not isinstance(other, Rope):
+            return NotImplemented
+        return self.to_delta() == other.to_delta()
+
+    def __repr__(self):
+        return f'Rope({self.to_delta().ops})'
+
+    def to_delta(self):
+        """Materialize the rope as a canonical document Delta."""
+        delta = Delta()
+        for o in _walk(self._root):
+            delta.push(o)
+        return delta
+
+    def compose(self, change):
+        """
+        Return a new rope with ``change`` applied.
+
+        Equivalent to ``Delta.compose`` on the document, but only the ranges
+        the change touches are rebuilt.
+        """
+        if hasattr(change, 'ops'):
+            change = change.ops
+        rest = self._root
+        done = None
+        for operator in change:
+            op_type = op.type_of(operator)
+            if op_type == 'insert':
+                done = _merge(done, _leaf(op.clone(operator)))
+                continue
+            length = op.length_of(operator)
+            if op_type == 'retain' and not operator.get('attributes') and not isinstance(operator['retain'], dict):
+                if length >= _total(rest):
+                    done = _merge(done, rest)
+                    rest = None
+                    continue
+            elif length > _total(rest):
+                raise ValueError(f'cannot {op_type} past the end of the document')
+            head, rest = _split(rest, length)
+            if op_type == 'retain':
+                if operator.get('attributes') or isinstance(operator['retain'], dict):
+                    head = _format_run(head, operator)
+                done = _merge(done, head)
+        return Rope._from_root(_merge(done, rest))
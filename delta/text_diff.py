@@ -0,0 +1,219 @@
+"""
+Deterministic plain-text diff engines for ``Delta.diff``.
+
+Engines take two strings and return a list of ``(code, text)`` tuples in the
+diff_match_patch format. Unlike diff_match_patch's ``diff_main``, these never
+consult the clock: the same inputs always produce the same diff, and the work
+is bounded by an edit budget rather than a wall-clock timeout.
+"""
+import diff_match_patch
+
+
+DIFF_EQUAL = 0
+DIFF_INSERT = 1
+DIFF_DELETE = -1
+
+# Edits each middle-snake search may spend before giving up on a region.
+DEFAULT_MAX_EDITS = 500
+
+
+def _common_prefix(a, b):
+    limit = min(len(a), len(b))
+    if a[:limit] == b[:limit]:
+        return limit
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b):
+    limit = min(len(a), len(b))
+    if limit and a[len(a) - limit:] == b[len(b) - limit:]:
+        return limit
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _replace(a, b):
+    diffs = []
+    if a:
+        diffs.append((DIFF_DELETE, a))
+    if b:
+        diffs.append((DIFF_INSERT, b))
+    return diffs
+
+
+def _middle_snake(a, b, budget):
+    """
+    Find the middle snake of the shortest edit script (Myers 1986, section 4b).
+
+    Returns the split point ``(x, y)``, or None when more than ``budget``
+    edits would be needed.
+    """
+    len_a, len_b = len(a), len(b)
+    max_d = (len_a + len_b + 1) // 2
+    if budget is not None:
+        max_d = min(max_d, budget)
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v1 = [-1] * v_length
+    v2 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2[v_offset + 1] = 0
+    delta = len_a - len_b
+    front = delta % 2 != 0
+    k1_start = k1_end = k2_start = k2_end = 0
+    for d in range(max_d):
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < len_a and y1 < len_b and a[x1] == b[y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > len_a:
+                k1_end += 2
+            elif y1 > len_b:
+                k1_start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                    if x1 >= len_a - v2[k2_offset]:
+                        return x1, y1
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < len_a and y2 < len_b and a[-x2 - 1] == b[-y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > len_a:
+                k2_end += 2
+            elif y2 > len_b:
+                k2_start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    if x1 >= len_a - x2:
+                        return x1, v_offset + x1 - k1_offset
+    return None
+
+
+def _myers(a, b, budget):
+    if a == b:
+        return [(DIFF_EQUAL, a)] if a else []
+    prefix = _common_prefix(a, b)
+    suffix = _common_suffix(a[prefix:], b[prefix:])
+    diffs = [(DIFF_EQUAL, a[:prefix])] if prefix else []
+    middle_a = a[prefix:len(a) - suffix]
+    middle_b = b[prefix:len(b) - suffix]
+    if not middle_a or not middle_b:
+        diffs.extend(_replace(middle_a, middle_b))
+    else:
+        split = _middle_snake(middle_a, middle_b, budget)
+        if split is None:
+            diffs.extend(_replace(middle_a, middle_b))
+        else:
+            x, y = split
+            diffs.extend(_myers(middle_a[:x], middle_b[:y], budget))
+            diffs.extend(_myers(middle_a[x:], middle_b[y:], budget))
+    if suffix:
+        diffs.append((DIFF_EQUAL, a[len(a) - suffix:]))
+    return diffs
+
+
+def _normalize(diffs):
+    """Merge adjacent runs and order each replacement as delete, then insert."""
+    result = []
+    deleted = []
+    inserted = []
+    for code, text in diffs:
+        if code == DIFF_DELETE:
+            deleted.append(text)
+        elif code == DIFF_INSERT:
+            inserted.append(text)
+        else:
+            result.extend(_replace(''.join(deleted), ''.join(inserted)))
+            deleted, inserted = [], []
+            if result and result[-1][0] == DIFF_EQUAL:
+                result[-1] = (DIFF_EQUAL, result[-1][1] + text)
+            else:
+                result.append((DIFF_EQUAL, text))
+    result.extend(_replace(''.join(deleted), ''.join(inserted)))
+    return result
+
+
+def _cleanup(diffs, semantic):
+    diffs = _normalize(diffs)
+    if semantic:
+        diffs = [tuple(d) for d in diffs]
+        diff_match_patch.diff_match_patch().diff_cleanupSemantic(diffs)
+    return [(code, text) for code, text in diffs]
+
+
+def myers(a, b, max_edits=DEFAULT_MAX_EDITS, semantic=True):
+    """
+    Diff two strings with Myers' linear-space O(ND) algorithm.
+
+    Each middle-snake search gives up after ``max_edits`` edits and replaces
+    that region wholesale, which bounds the cost on unrelated texts; pass
+    None for an exact (minimal) diff at O(ND) cost. With
+    ``semantic`` set, diff_match_patch's semantic cleanup (which is
+    deterministic) merges trivial equalities as the default engine does.
+    """
+    return _cleanup(_myers(a, b, max_edits), semantic)
+
+
+def line_mode(a, b, max_edits=DEFAULT_MAX_EDITS, semantic=True):
+    """
+    Diff two strings line by line, then character by character inside each
+    run of changed lines.
+
+    Suited to block-structured documents, where most edits touch a few lines
+    and whole lines come and go.
+    """
+    ids = {}
+    a_lines = a.splitlines(keepends=True)
+    b_lines = b.splitlines(keepends=True)
+    a_ids = tuple(ids.setdefault(line, len(ids)) for line in a_lines)
+    b_ids = tuple(ids.setdefault(line, len(ids)) for line in b_lines)
+
+    diffs = []
+    deleted = []
+    inserted = []
+    a_index = b_index = 0
+    for code, chunk in _myers(a_ids, b_ids, max_edits):
+        if code == DIFF_DELETE:
+            deleted.append(''.join(a_lines[a_index:a_index + len(chunk)]))
+            a_index += len(chunk)
+        elif code == DIFF_INSERT:
+            inserted.append(''.join(b_lines[b_index:b_index + len(chunk)]))
+            b_index += len(chunk)
+        else:
+            diffs.extend(_myers(''.join(deleted), ''.join(inserted), max_edits))
+            deleted, inserted = [], []
+            diffs.append((DIFF_EQUAL, ''.join(a_lines[a_index:a_index + len(chunk)])))
+            a_index += len(chunk)
+            b_index += len(chunk)
+    diffs.extend(_myers(''.join(deleted), ''.join(inserted), max_edits))
+    return _cleanup(diffs, semantic)
@@ -0,0 +1,38 @@
+from delta import Delta
+from delta.block_index import BlockIndex
+
+
+def test_spans_and_lookups():
+    index = Delta().insert('Hello\n\nWorld').block_index()
+    assert index.newlines == [5, 6]
+    assert len(index) == 3
+    assert index.spans() == [{'from': 0, 'to': 6}, {'from': 6, 'to': 7}, {'from': 7, 'to': 13}]
+    assert index.boundaries() == [0, 6, 7, 13]
+    assert [index.block_at(i) for i in (0, 5, 6, 7, 12)] == [0, 0, 1, 2, 2]
+    assert index.is_boundary(6) and not index.is_boundary(5)
+    assert index.has_newline(3, 6) and not index.has_newline(7, 12)
+
+
+def test_utf16_offsets():
+    index = BlockIndex.from_document(Delta().insert('😀\n').insert({'image': 'a'}).insert('\n'))
+    assert index.newlines == [2, 4]
+    assert index.is_canonical()
+    assert Delta().insert('a😀\nb\n😀😀\n').block_index().newlines == [3, 5, 10]
+
+
+def test_compose_updates_incrementally():
+    doc = Delta().insert('A\nB\nC\n')
+    doc.block_index()
+    change = Delta().retain(1).delete(2).retain(2).insert('x\ny\n')
+    composed = doc.compose(change)
+    assert composed._block_index is not None
+    assert composed.block_index() == BlockIndex.from_document(composed)
+    assert composed.block_index().newlines == [1, 4, 6, 7]
+
+
+def test_index_follows_pushes_through_shared_ops():
+    doc = Delta().insert('A\nB\n')
+    assert len(doc.block_index()) == 2
+    Delta(doc).insert('C\n')
+    assert doc.block_index().newlines == [1, 3, 5]
+    assert doc.compose(Delta().retain(6).insert('D\n')).block_index().newlines == [1, 3, 5, 7]
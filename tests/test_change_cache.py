@@ -0,0 +1,65 @@
+from delta import Delta
+from delta.block import BlockDelta
+from delta.change import apply_change, resolution_cache, transform_change
+from delta.change_cache import ChangeCache, change_fingerprint
+
+
+def test_repeated_resolution_hits_cache():
+    resolution_cache.clear()
+    document = Delta().insert('A\nB\nC\n')
+    change = {'delta': Delta().retain(2).insert('x'), 'blockDelta': BlockDelta().move(1, 0)}
+    other = {'delta': Delta().delete(1), 'blockDelta': BlockDelta()}
+
+    applied = apply_change(document, change)
+    misses = resolution_cache.misses
+    transform_change(other, change, document)
+    assert resolution_cache.hits > 0
+    assert apply_change(document, change) == applied
+    assert resolution_cache.misses > misses
+
+    document.insert('D\n')
+    hits = resolution_cache.hits
+    reapplied = apply_change(document, change)
+    assert resolution_cache.hits == hits
+    assert reapplied == apply_change(Delta().insert('A\nB\nC\nD\n'), change)
+
+    resolution_cache.invalidate(document)
+    assert all(key[0] is not document.cache_token() for key in resolution_cache._entries)
+
+
+def test_lru_eviction_and_fingerprints():
+    cache = ChangeCache(maxsize=2)
+    documents = [Delta().insert(f'{i}\n') for i in range(3)]
+    for document in documents:
+        cache.state(document, '\n', lambda: object())
+    assert len(cache) == 2
+    cache.state(documents[0], '\n', lambda: None)
+    assert cache.stats() == {'hits': 0, 'misses': 4, 'size': 2, 'maxsize': 2}
+
+    bold = {'delta': Delta().retain(1, bold=True), 'blockDelta': BlockDelta()}
+    one = {'delta': Delta().retain(1, bold=1), 'blockDelta': BlockDelta()}
+    assert change_fingerprint(bold) == change_fingerprint({'delta': Delta().retain(1, bold=True), 'blockDelta': BlockDelta()})
+    assert change_fingerprint(bold) != change_fingerprint(one)
+
+
+def test_push_through_shared_ops_changes_cache_token():
+    resolution_cache.clear()
+    document = Delta([{'insert': 'a\nb\n'}])
+    move = {'delta': Delta(), 'blockDelta': BlockDelta().move(1, 2)}
+    assert apply_change(document, move) == Delta().insert('b\na\n')
+
+    Delta(document).insert('q\n')
+    assert apply_change(document, move) == Delta().insert('b\na\nq\n')
+
+
+def test_compact_changes_are_fingerprinted_like_dict_changes():
+    resolution_cache.clear()
+    document = Delta().insert('A\nB\n')
+    change = {'delta': Delta().retain(1).insert('x'), 'blockDelta': BlockDelta().move(1, 0)}
+    compact = {'delta': change['delta'].compact(), 'blockDelta': change['blockDelta']}
+    other = {'delta': Delta().retain(3).insert('y'), 'blockDelta': BlockDelta()}
+
+    assert change_fingerprint(compact) == change_fingerprint(change)
+    assert apply_change(document, compact) == apply_change(document, change)
+    assert transform_change(other, compact, document) == transform_change(other, change, document)
+    assert transform_change(compact, other, document) == transform_change(change, other, document)
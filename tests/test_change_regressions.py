@@ -1,6 +1,10 @@
+import pytest
+
 from delta import Delta
 from delta.block import BlockDelta
-from delta.change import apply_change, compose_change
+from delta.change import (
+    apply_change, compose_change, transform_change, transform_change_against_history, transform_change_pair,
+)
 
 
 def test_attributed_compose_falls_back_when_structural_lowering_is_not_exact():
@@ -19,3 +23,92 @@ def test_attributed_compose_falls_back_when_structural_lowering_is_not_exact():
 
     assert apply_change(base, composed) == sequential
     assert composed['blockDelta'] == BlockDelta()
+
+
+def test_transform_pulls_restored_boundary_back_through_prior_moves():
+    base = (Delta().insert('\nb').insert('\n\nb\n', header=1).insert('\n', bold=True)
+            .insert('ba', header=1).insert('a\n'))
+    moved = {
+        'delta': Delta().insert('\nz', header=1),
+        'blockDelta': BlockDelta().move(1, 3).retain(2).move(1, 2),
+    }
+    deleted = {'delta': Delta().delete(3), 'blockDelta': BlockDelta()}
+
+    transformed = transform_change(deleted, moved, base)
+
+    assert transformed['delta'] == Delta().insert('z\n\n', header=1)
+    assert transformed['blockDelta'] == BlockDelta().retain(4).move(1, 1)
+
+
+def test_trusted_lowering_matches_verified_lowering():
+    base = Delta().insert('A\nB\nC\n')
+    first = {'delta': Delta(), 'blockDelta': BlockDelta().retain(1).move(1, 3)}
+    second = {'delta': Delta(), 'blockDelta': BlockDelta().move(1, 0)}
+    edit = {'delta': Delta().retain(1).insert('x'), 'blockDelta': BlockDelta().move(1, 3)}
+
+    verified = [compose_change(base, first, second), transform_change(edit, first, base)]
+    assert [compose_change(base, first, second, verification='trust'),
+            transform_change(edit, first, base, verification='trust')] == verified
+
+    with pytest.raises(ValueError):
+        transform_change(edit, first, base, verification='sometimes')
+
+
+def test_transform_rejects_lowering_without_final_newline():
+    base = Delta().insert('ba').insert('ba', bold=True).insert('éaé\n')
+    replaced = {'delta': Delta().insert('\n').delete(8), 'blockDelta': BlockDelta()}
+    moved = {'delta': Delta().retain(1, bold=None).insert('ab\né'), 'blockDelta': BlockDelta().move(1, 1)}
+
+    for priority in (True, False):
+        with pytest.raises(ValueError, match='final newline'):
+            transform_change(replaced, moved, base, priority)
+
+
+def test_transform_against_history_matches_sequential_transforms():
+    base = Delta().insert('A\nB\nC\n')
+    history = [
+        {'delta': Delta().insert('x'), 'blockDelta': BlockDelta()},
+        {'delta': Delta().retain(3).insert('y'), 'blockDelta': BlockDelta()},
+        {'delta': Delta(), 'blockDelta': BlockDelta().retain(1).move(1, 3)},
+        {'delta': Delta().retain(5).delete(1), 'blockDelta': BlockDelta()},
+    ]
+    incoming = {'delta': Delta().retain(4).insert('z'), 'blockDelta': BlockDelta()}
+
+    expected = incoming
+    document = base
+    for prior in history:
+        expected = transform_change(prior, expected, document, True)
+        document = apply_change(document, prior)
+
+    assert transform_change_against_history(incoming, history, base, True) == expected
+    assert transform_change_against_history(incoming, history[:2], base, True) == {
+        'delta': Delta.transform_many([prior['delta'] for prior in history[:2]], incoming['delta'], True),
+        'blockDelta': BlockDelta(),
+    }
+
+
+def test_transform_against_history_rejects_non_canonical_intermediate_documents():
+    base = Delta().insert('A\nB\n')
+    history = [
+        {'delta': Delta().retain(3).delete(1), 'blockDelta': BlockDelta()},
+        {'delta': Delta().insert('x'), 'blockDelta': BlockDelta()},
+    ]
+    incoming = {'delta': Delta().insert('z'), 'blockDelta': BlockDelta()}
+
+    with pytest.raises(ValueError, match='final newline'):
+        transform_change(history[1], transform_change(history[0], incoming, base, True), apply_change(base, history[0]), True)
+    with pytest.raises(ValueError, match='final newline'):
+        transform_change_against_history(incoming, history, base, True)
+    assert transform_change_against_history(incoming, history[:1], base, True) == transform_change(history[0], incoming, base, True)
+
+
+def test_transform_change_pair_matches_both_transforms():
+    base = Delta().insert('A\nB\nC\n')
+    moved = {'delta': Delta().retain(1).insert('x'), 'blockDelta': BlockDelta().move(1, 3)}
+    edited = {'delta': Delta().retain(3).insert('y'), 'blockDelta': BlockDelta()}
+
+    for left, right in [(moved, edited), (edited, moved), (moved, moved), (edited, edited)]:
+        assert transform_change_pair(left, right, base, True) == (
+            transform_change(left, right, base, True),
+            transform_change(right, left, base, False),
+        )
@@ -20,3 +20,28 @@ def test_immutability():
     assert a1 == a2
     assert b1 == b2
     assert attr1 == attr2
+
+
+def test_result_does_not_share_nested_values():
+    a = Delta().insert('Test', link={'href': 'a'})
+    b = Delta().retain(2, color='red').delete(1)
+    result = a.compose(b)
+    result.ops[0]['attributes']['link']['href'] = 'b'
+    result.ops[-1]['attributes']['link']['href'] = 'b'
+    assert a == Delta().insert('Test', link={'href': 'a'})
+
+
+def test_compose_many():
+    doc = Delta().insert('Hello\n')
+    changes = [
+        Delta().retain(5).insert(' World'),
+        Delta().retain(1).delete(2),
+        Delta().retain(3, bold=True),
+        Delta().insert('>'),
+    ]
+    expected = doc
+    for change in changes:
+        expected = expected.compose(change)
+    assert Delta.compose_many([doc] + changes) == expected
+    assert Delta.compose_many([]) == Delta()
+    assert Delta.compose_many([doc]) == doc
@@ -3,7 +3,7 @@
 #
 # The test below checks basic construction which is Python-specific.
 
-from delta import Delta
+from delta import Delta, op
 
 
 def test_creation():
@@ -13,3 +13,61 @@ def test_creation():
     assert d.ops == []
     d2 = Delta(d)
     assert d2.ops == []
+
+
+def test_compact_round_trip():
+    d = Delta().insert('Hello', bold=True).insert({'image': 'a.png'}).insert('\n')
+    compact = d.compact()
+    assert compact == d
+    assert compact.compose(Delta().retain(1).delete(1)) == d.compose(Delta().retain(1).delete(1))
+    assert all(type(o) is dict for o in compact.expand().ops)
+    assert compact.expand().ops == d.ops
+
+
+def test_compact_form_survives_edits():
+    d = Delta().insert('Hello', bold=True).insert(' World\n')
+    compact = d.compact()
+    change = Delta().retain(2, italic=True).delete(3).insert('y', bold=True)
+    results = [
+        compact.compose(change),
+        change.invert(compact),
+        compact.compose(change).compose(change.invert(compact)),
+        change.compact().transform(Delta().retain(4).insert('x'), True),
+        *change.compact().transform_pair(Delta().retain(1, bold=None)),
+    ]
+    for result in results:
+        assert all(type(o) is op.Op for o in result.ops)
+    assert results[0] == d.compose(change)
+    assert results[1] == change.invert(d)
+    assert results[2] == d
+
+    expanded = results[0].expand()
+    for o in expanded.ops:
+        assert type(o) is dict and type(o.get('attributes', {})) is dict
+    expanded.ops[0]['attributes']['bold'] = False
+    assert results[0].ops[0]['attributes']['bold'] is True
+
+
+def test_slice_index_follows_mutation():
+    d = Delta().insert('Hello', bold=True).insert(' World')
+    assert d[3:7] == Delta().insert('lo', bold=True).insert(' W')
+    assert len(d) == 11
+    d.insert('!')
+    assert len(d) == 12
+    assert d[10:] == Delta().insert('d!')
+    d.retain(3).chop()
+    assert d[11] == Delta().insert('!')
+
+
+def test_slice_index_follows_pushes_through_shared_ops():
+    d = Delta().insert('ab\n')
+    assert len(d) == 3 and d[1:2] == Delta().insert('b')
+    Delta(d).insert('xyz')
+    assert len(d) == d.length() == 6
+    assert d[3:] == Delta().insert('xyz')
+    d.ops[0]['insert'] = 'a'
+    assert len(d) == 1
+    change = Delta().retain(1).insert('q')
+    assert change.transform_position(4) == 5
+    Delta(change).insert('r')
+    assert change.transform_position(4) == 6
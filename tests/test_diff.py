@@ -3,6 +3,8 @@
 #
 # The test below checks immutability which cannot be expressed as a JSON fixture.
 
+import pytest
+
 from delta import Delta
 
 
@@ -19,3 +21,35 @@ def test_immutability():
     assert a1 == a2
     assert b2 == b2
     assert attr1 == attr2
+
+
+def test_diff_with_hint():
+    a = Delta().insert('Hello', bold=True).insert(' World\n')
+    b = Delta().insert('Hello', bold=True).insert(' Wide World\n')
+    assert a.diff(b, hint=(6, 1)) == Delta().retain(7).insert('ide W')
+    # A hint that does not cover the change is ignored
+    assert a.diff(b, hint=(0, 1)) == a.diff(b)
+    assert a.compose(a.diff(b, hint=(0, 1))) == b
+
+
+def test_diff_engine_registry():
+    a = Delta().insert('one\ntwo\nthree\n')
+    b = Delta().insert('one\n2\nthree\nfour\n')
+    for engine in ('dmp', 'myers', 'lines'):
+        assert a.compose(a.diff(b, engine=engine)) == b
+    assert a.diff(b, engine='lines') == Delta().retain(4).delete(3).insert('2').retain(7).insert('four\n')
+
+    Delta.register_diff_engine('replace', lambda x, y: [(-1, x), (1, y)])
+    try:
+        assert a.diff(b, engine='replace') == Delta().insert('one\n2\nthree\nfour\n').delete(14)
+    finally:
+        Delta.unregister_diff_engine('replace')
+    with pytest.raises(ValueError):
+        a.diff(b, engine='replace')
+
+
+def test_myers_edit_budget():
+    from delta.text_diff import myers
+    assert myers('abcdef', 'abXdef') == [(0, 'ab'), (-1, 'c'), (1, 'X'), (0, 'def')]
+    # Past the budget the changed region is replaced wholesale
+    assert myers('axbxc', 'aybyc', max_edits=1, semantic=False) == [(0, 'a'), (-1, 'xbx'), (1, 'yby'), (0, 'c')]
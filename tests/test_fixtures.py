@@ -242,14 +242,15 @@ class TestDeltaComposeEmbedNoHandler:
 class TestDeltaDiff:
     fixture = load_fixture("delta-diff.json")
 
+    @pytest.mark.parametrize("engine", ["dmp", "myers", "lines"])
     @pytest.mark.parametrize(
         "test", fixture["tests"], ids=[t["name"] for t in fixture["tests"]]
     )
-    def test_diff(self, test):
+    def test_diff(self, test, engine):
         a = delta_from_ops(test["a"])
         b = delta_from_ops(test["b"])
         expected = delta_from_ops(test["expected"])
-        assert a.diff(b) == expected
+        assert a.diff(b, engine=engine) == expected
 
     @pytest.mark.parametrize(
         "test",
@@ -278,6 +279,16 @@ class TestDeltaTransform:
         expected = delta_from_ops(test["expected"])
         assert a.transform(b, test["priority"]) == expected
 
+    @pytest.mark.parametrize(
+        "test", fixture["tests"], ids=[t["name"] for t in fixture["tests"]]
+    )
+    def test_transform_pair(self, test):
+        a = delta_from_ops(test["a"])
+        b = delta_from_ops(test["b"])
+        expected = delta_from_ops(test["expected"])
+        priority = test["priority"]
+        assert a.transform_pair(b, priority) == (expected, b.transform(a, not priority))
+
 
 class TestDeltaTransformEmbed:
     fixture = load_fixture("delta-transform-embed.json")
@@ -297,6 +308,16 @@ class TestDeltaTransformEmbed:
         expected = delta_from_ops(test["expected"])
         assert a.transform(b, test["priority"]) == expected
 
+    @pytest.mark.parametrize(
+        "test", fixture["tests"], ids=[t["name"] for t in fixture["tests"]]
+    )
+    def test_transform_pair_embed(self, test):
+        a = delta_from_ops(test["a"])
+        b = delta_from_ops(test["b"])
+        expected = delta_from_ops(test["expected"])
+        priority = test["priority"]
+        assert a.transform_pair(b, priority) == (expected, b.transform(a, not priority))
+
 
 # ── Delta transformPosition ──
 
@@ -312,6 +333,17 @@ class TestDeltaTransformPosition:
         priority = test.get("priority", False)
         assert delta.transform(test["index"], priority) == test["expected"]
 
+    @pytest.mark.parametrize(
+        "test", fixture["tests"], ids=[t["name"] for t in fixture["tests"]]
+    )
+    def test_transform_positions(self, test):
+        delta = delta_from_ops(test["delta"])
+        priority = test.get("priority", False)
+        index = test["index"]
+        expected = test["expected"]
+        assert delta.transform_positions([index, (index, index)], priority) == [
+            expected, (expected, expected)]
+
 
 # ── Delta invert ──
 
@@ -86,3 +86,14 @@ def test_partition():
     failed = [o for o in delta if not isinstance(o.get('insert'), str)]
     assert passed == [delta.ops[0], delta.ops[2]]
     assert failed == [delta.ops[1]]
+
+
+def test_iter_line_spans():
+    delta = Delta().insert('😀\nab', bold=True).insert('c\n', align='right')
+    spans = list(delta.iter_line_spans())
+    assert [(s['start'], s['end'], s['attributes'], s['index']) for s in spans] == [
+        ((0, 0), (0, 1), {'bold': True}, 0),
+        ((0, 2), (1, 1), {'align': 'right'}, 1),
+    ]
+    assert delta.line_delta(spans[0]) == Delta().insert('😀', bold=True)
+    assert delta.line_delta(spans[1]) == Delta().insert('ab', bold=True).insert('c', align='right')
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from delta import Delta
+from delta.labeled_state import (
+    LabeledState, as_labeled_state, clone_labeled_state, labeled_state_from_document, labeled_state_to_delta,
+    replay_resolved_delta, resolve_delta_against_state,
+)
+
+
+def test_columnar_runs_and_views():
+    doc = Delta().insert('ab', bold=True).insert('😀').insert({'image': 'x'}).insert('\n')
+    state = labeled_state_from_document(doc)
+    assert isinstance(state, LabeledState)
+    assert len(state) == 6
+    assert state.unit_ids() == [1, 2, 3, 4, 5, 6]
+    assert len(state._runs) == 4
+    assert state['units'][0] == {'id': 1, 'value': 'a', 'attributes': {'bold': True}}
+    assert state['units'][4] == {'id': 5, 'value': {'image': 'x'}, 'attributes': {}}
+    assert state['gaps'][6] == {'gapId': 6, 'afterUnitId': 6, 'beforeUnitId': None}
+    assert state.newline_indices() == [5]
+    assert labeled_state_to_delta(state) == doc
+
+
+def test_dict_states_round_trip():
+    state = labeled_state_from_document(Delta().insert('AB\n'))
+    converted = as_labeled_state(state.to_dict())
+    assert converted == state
+    assert converted == state.to_dict()
+
+    resolved = resolve_delta_against_state(state.to_dict(), Delta().retain(1).insert('X').delete(1))
+    replayed = replay_resolved_delta(state, resolved)
+    assert replayed.unit_ids() == [1, 4, 3]
+    assert replayed.origin(1) == {'gapId': 1, 'afterUnitId': 1, 'beforeUnitId': 2}
+    assert labeled_state_to_delta(replayed) == Delta().insert('AX\n')
+
+
+def test_to_dict_is_plain_and_detached():
+    state = labeled_state_from_document(Delta().insert('A', bold=True).insert('B\n'))
+    plain = state.to_dict()
+    assert json.loads(json.dumps(plain)) == plain
+    plain['units'][0]['attributes']['bold'] = None
+    plain['units'].pop()
+    assert state['units'][0]['attributes'] == {'bold': True}
+    assert len(state) == 3
+    with pytest.raises(TypeError):
+        state['units'][0] = plain['units'][0]
+
+
+def test_runs_split_only_at_edits():
+    state = labeled_state_from_document(Delta().insert('Hello World\n'))
+    assert state._runs == [(1, 'Hello World\n', {}, None)]
+    resolved = resolve_delta_against_state(state, Delta().retain(5).delete(1).retain(1, bold=True))
+    replayed = replay_resolved_delta(state, resolved)
+    assert replayed._runs == [(1, 'Hello', {}, None), (7, 'W', {'bold': True}, None), (8, 'orld\n', {}, None)]
+    assert replayed.index_of(8) == 6 and replayed.index_of(6) == -1
+    assert replayed.unit_ids(4, 7) == [5, 7, 8]
+
+
+def test_id_lookup_after_moves():
+    state = LabeledState.from_units([
+        {'id': i, 'value': c, 'attributes': {}} for i, c in zip([7, 8, 1, 2, 3, 9], 'ab\ncd\n')
+    ])
+    assert [state.index_of(i) for i in (1, 3, 7, 9, 4)] == [2, 4, 0, 5, -1]
+    duplicated = state.insert_units(6, [{'id': 2, 'value': 'x', 'attributes': {}}])
+    assert duplicated.index_of(2) == 3
+    assert duplicated.last_index_of(2) == 6
+
+
+def test_replay_places_insert_groups_in_one_pass():
+    state = labeled_state_from_document(Delta().insert('ab\n'))
+    change = Delta().retain(1).insert('x\ny').insert({'img': 1}).delete(1).insert('z')
+    replayed = replay_resolved_delta(state, resolve_delta_against_state(state, change))
+    assert labeled_state_to_delta(replayed) == Delta().insert('ax\ny').insert({'img': 1}).insert('z\n')
+    assert replayed.unit_ids() == [1, 4, 5, 6, 7, 8, 3]
+
+
+def test_clones_and_edits_share_runs():
+    state = labeled_state_from_document(Delta().insert('a\n').insert('b\n', bold=True).insert('c\n'))
+    assert clone_labeled_state(state) is state
+    edited = state.insert_units(0, [{'id': 9, 'value': 'x', 'attributes': {}}])
+    assert edited._runs[2] is state._runs[1]
+    assert labeled_state_to_delta(state) == Delta().insert('a\n').insert('b\n', bold=True).insert('c\n')
+
+
+def test_structural_equality():
+    state = labeled_state_from_document(Delta().insert('ab😀\n'))
+    split = LabeledState.from_units([
+        {'id': 7, 'value': 'a', 'attributes': {}},
+        {'id': 9, 'value': 'b', 'attributes': {}},
+        {'id': 10, 'value': '😀', 'attributes': {}},
+        {'id': 11, 'value': '\n', 'attributes': {}},
+    ])
+    assert state.same_document(split)
+    assert not state.same_units(split)
+    assert not state.same_document(labeled_state_from_document(Delta().insert('ab😀\n', bold=True)))
+
+    inserted = state.insert_units(1, [{'id': 9, 'value': 'x', 'attributes': {}, '_origin_gap': state.gap(1)}])
+    assert not inserted.same_units(state)
+    assert inserted.same_units(state, skip_inserted=True)
@@ -3,7 +3,7 @@
 #
 # The tests below cover Python-specific iterator behavior (reset, __iter__) not in fixtures.
 
-from delta import op
+from delta import Delta, op
 import math
 
 
@@ -50,3 +50,93 @@ def test_empty_iterator():
 
 def test_type_of_empty():
     assert op.type({}) is None
+
+
+def test_utf16_len_and_is_bmp():
+    assert op.utf16_len('abc') == 3
+    assert op.utf16_len('é😀x') == 4
+    assert op.utf16_len('\ud83d') == 1
+    assert op.is_bmp('héllo') is True
+    assert op.is_bmp('a😀') is False
+
+
+def test_utf16_slice_astral():
+    s = 'ab😀cd😀'
+    assert op.utf16_slice(s, 0, 2) == 'ab'
+    assert op.utf16_slice(s, 2, 2) == '😀'
+    assert op.utf16_slice(s, 4, 3) == 'cd😀'
+    assert op.utf16_slice(s, 3, 1) == 'c'
+    assert op.utf16_slice('abc', 1, 5) == 'bc'
+
+
+def test_compact_op_round_trip():
+    for o in [
+        {'insert': 'a😀', 'attributes': {'bold': True}},
+        {'insert': {'image': 'a.png'}},
+        {'retain': 3, 'attributes': {'bold': None}},
+        {'retain': {'delta': []}},
+        {'delete': 2},
+    ]:
+        compact = op.Op.from_dict(o)
+        assert compact == o
+        assert compact.to_dict() == o
+        assert op.length(compact) == op.length(o)
+        assert op.type(compact) == op.type(o)
+
+
+def test_compact_op_iterator_split():
+    iterator = op.iterator([op.Op.from_dict({'insert': 'Hello', 'attributes': {'bold': True}})])
+    head = iterator.next(2)
+    assert isinstance(head, op.Op)
+    assert head == {'insert': 'He', 'attributes': {'bold': True}}
+    assert iterator.next() == {'insert': 'llo', 'attributes': {'bold': True}}
+
+
+def test_intern_attributes():
+    bold = op.intern_attributes({'bold': True})
+    assert bold is op.intern_attributes({'bold': True})
+    assert bold is not op.intern_attributes({'bold': 1})
+    assert bold == {'bold': True}
+    try:
+        bold['italic'] = True
+        assert False
+    except TypeError:
+        pass
+    nested = {'link': {'href': 'a'}}
+    assert op.intern_attributes(nested) is nested
+
+
+def test_interned_attribute_ops_are_memoized():
+    bold = op.intern_attributes({'bold': True})
+    red = op.intern_attributes({'color': 'red'})
+    composed = op.compose(bold, red)
+    assert composed == {'bold': True, 'color': 'red'}
+    assert composed is op.compose(bold, red)
+    assert op.diff(bold, bold) is None
+    assert op.transform(bold, red, True) is red
+
+
+def test_built_deltas_share_interned_attributes():
+    first = Delta().insert('a', bold=True).retain(2, color='red')
+    second = Delta().insert('b', bold=True).retain(3, color='red')
+    assert first.ops[0]['attributes'] is second.ops[0]['attributes']
+    assert first.ops[1]['attributes'] is second.ops[1]['attributes']
+
+    doc = Delta().insert('abc\n', italic=True)
+    composed = doc.compose(Delta().retain(2, bold=True))
+    assert composed.ops[0]['attributes'] is op.intern_attributes({'italic': True, 'bold': True})
+    assert composed.ops[1]['attributes'] is doc.ops[0]['attributes']
+    inverted = Delta().retain(2, bold=True).invert(doc)
+    assert inverted.ops[0]['attributes'] is op.intern_attributes({'bold': None})
+    transformed = Delta().retain(1, bold=True).transform(Delta().retain(1, bold=False, color='red'), True)
+    assert transformed.ops[0]['attributes'] is op.intern_attributes({'color': 'red'})
+
+
+def test_utf16_caches_are_bounded_by_text_size():
+    op._utf16_profile.cache_clear()
+    huge = '😀' * ((1 << 20) + 1)
+    assert op.utf16_len(huge) == 2 * len(huge)
+    assert op._utf16_profile.cache_size() == 0
+    for i in range(64):
+        assert op.utf16_len('é' * (1 << 15) + str(i)) == (1 << 15) + len(str(i))
+    assert op._utf16_profile.cache_size() <= 1 << 20
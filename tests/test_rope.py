@@ -0,0 +1,39 @@
+from delta import Delta
+from delta.rope import Rope
+
+import pytest
+
+
+def test_round_trip():
+    doc = Delta().insert('Hello', bold=True).insert(' World\n')
+    assert Rope(doc).to_delta() == doc
+    assert len(Rope(doc)) == len(doc)
+
+
+def test_compose_matches_delta():
+    doc = Delta().insert('Hello', bold=True).insert({'image': 'a.png'}).insert(' World\n')
+    changes = [
+        Delta().retain(3).insert('p', italic=True).delete(2),
+        Delta().retain(2).retain(4, bold=None, color='red'),
+        Delta().delete(1).retain(7).insert('!\n'),
+        Delta().retain(100),
+    ]
+    rope = Rope(doc)
+    for change in changes:
+        doc = doc.compose(change)
+        rope = rope.compose(change)
+        assert rope.to_delta() == doc
+
+
+def test_compose_is_persistent():
+    original = Rope(Delta().insert('abc\n'))
+    changed = original.compose(Delta().retain(1).delete(1))
+    assert original.to_delta() == Delta().insert('abc\n')
+    assert changed.to_delta() == Delta().insert('ac\n')
+
+
+def test_rejects_non_documents():
+    with pytest.raises(ValueError):
+        Rope(Delta().retain(1))
+    with pytest.raises(ValueError):
+        Rope(Delta().insert('a')).compose(Delta().delete(2))
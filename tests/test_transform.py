@@ -17,3 +17,24 @@ def test_immutability():
     assert a1.transform(b1, True) == expected
     assert a1 == a2
     assert b1 == b2
+
+
+def test_transform_positions():
+    delta = Delta().retain(2).insert('ab').delete(1)
+    indices = [5, 0, 2, (1, 4), 2]
+    priorities = [False, False, False, True, True]
+    assert delta.transform_positions(indices, priorities) == [6, 0, 4, (1, 5), 2]
+    assert delta.transform_positions(indices[:3]) == [
+        delta.transform_position(i) for i in indices[:3]]
+
+
+def test_transform_many():
+    history = [Delta().insert('ab'), Delta(), Delta().delete(1).retain(1).insert('c')]
+    other = Delta().insert('x').retain(1).insert('y')
+    expected = other
+    for delta in history:
+        expected = delta.transform(expected, True)
+    assert Delta.transform_many(history, other, True) == expected
+    assert Delta.transform_many(history, 1) == 3
+    assert Delta.transform_many([], other) == other
+    assert Delta.transform_many([], other) is not other